@@ -1,130 +1,2482 @@
 import collections
+import concurrent.futures
 import datetime
+import functools
+import json
+import math
+from multiprocessing import shared_memory
 import os
+import random
+import socket
+import socketserver
+import statistics
+import tempfile
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only the array engines need it
+    np = None
+
+try:
+    import numba
+except ImportError:  # Numba is optional; without it walks stay in Python
+    numba = None
+
+# Default number of entries kept per generation in a TrajectoryMemo.
+DEFAULT_MEMO_SIZE = 1_000_000
+
+# Largest image table the 'auto' engine will label with the Numba cascade
+# (label_image_by_cascade). The cascade builds no successor table: its one
+# table-sized array holds the solved entries and is turned into the labels
+# in place, next to chunk temporaries of some tens of MB. For numbers
+# below 10^10 that array has about 1.1 * 10^9 entries (4.4 GB as uint32).
+MAX_SUCCESSOR_TABLE_SIZE = 12 * 10**8
+
+# Largest table that is labeled by peeling (label_basins, basin_statistics),
+# which is the path without Numba and for tail lengths. Peeling holds the
+# indegrees, the peel rounds and the labels next to the table, about 6.5x
+# the table's bytes (2.9 GB for the 10^9 decade's 1.1 * 10^8 entries).
+MAX_PEELED_TABLE_SIZE = 12 * 10**7
+
+# Non-verbose walks from numbers with more digits than this switch to
+# Brent's cycle detection, which does not keep the whole trajectory.
+BRENT_DIGIT_THRESHOLD = 1000
+
+# Above this many digits, non-verbose walks keep values as digit strings.
+# It stays below CPython's default int/str conversion limit of 4300 digits,
+# beyond which str(n) raises ValueError, and int/str round trips are
+# quadratic well before that.
+DIGIT_ARRAY_THRESHOLD = 4000
+
+# Digits per limb in the digit-string borrow pass. Limbs of a few hundred
+# digits keep int() on each limb cheap while cutting the Python-level loop.
+_LIMB_DIGITS = 200
+
+# Attractor set loaded at startup by the interactive program, if present.
+DEFAULT_ATTRACTOR_FILE = "attractors.json"
+
+# Where multiprocessing.shared_memory keeps its blocks on Linux.
+SHARED_MEMORY_DIR = "/dev/shm"
+
+# Numbers handled per vectorized batch when building or scanning tables.
+TABLE_CHUNK_SIZE = 2**22
+
+# Numbers below this are walked by the Numba kernels when Numba is
+# installed. Their reversals and differences also stay below it, so every
+# value fits an int64.
+JIT_LIMIT = 10**18
+
+# Longest period in k that analyze_number_family looks for.
+FAMILY_MAX_PERIOD = 12
+
+# Numbers below this fit the two-limb (base 10^19) uint64 walker.
+TWO_LIMB_LIMIT = 10**38
+
+# Random starting numbers added per round by estimate_loop_frequencies, and
+# how many leading digits (next to the digit length) define its strata.
+SAMPLE_BATCH_SIZE = 4096
+SAMPLE_LEADING_DIGITS = 2
+
+# The interactive range mode offers sampling for ranges larger than this.
+SAMPLE_RANGE_SIZE = 10**12
+
+# Wall time each chunk handed to a worker process should take. Chunk sizes
+# follow the measured throughput, so uneven walk costs do not leave
+# processes idle, and a progress line comes about this often per process.
+CHUNK_TARGET_SECONDS = 0.5
+
+# A checkpointed range run saves its progress at most this often, and
+# walks this many numbers between checks when it runs in one process.
+CHECKPOINT_SECONDS = 60
+CHECKPOINT_CHUNK_SIZE = 10**5
+
+# The interactive range mode offers checkpoints for ranges larger than this
+# that would be walked; ranges answered from a successor table finish
+# within one table build and are not checkpointed.
+CHECKPOINT_RANGE_SIZE = 10**9
+
+# Numbers per work unit a RangeCoordinator hands out, seconds a worker may
+# hold a unit before it goes to another worker, and the default TCP port.
+COORDINATOR_UNIT_SIZE = 10**6
+LEASE_SECONDS = 600
+DEFAULT_COORDINATOR_PORT = 52101
+
+# Lockstep rounds after which a shared-table walk checks whether it is
+# going around a loop nobody has recorded yet. Longer than the longest
+# tail of tables up to 9 digits, so it rarely triggers.
+RESULT_CHASE_ROUNDS = 128
+
+# Shared memory blocks attached by a worker process, by role, as
+# (block, array) pairs; see _attach_shared_tables.
+_shared_tables = {}
+
+# reverse_number uses the chunked arithmetic path for numbers below this
+# and str() above it. Chunks win up to 8 digits on CPython 3.11;
+# calibrate_reverse_number measures the crossover on the running machine.
+CHUNKED_REVERSE_LIMIT = 10**8
+
+# Digits per chunk in the arithmetic reversal, and each 4-digit chunk
+# (leading zeros included) reversed: 1200 -> 21, 12 -> 2100.
+_REVERSE_CHUNK_DIGITS = 4
+_REVERSE_CHUNK_BASE = 10**_REVERSE_CHUNK_DIGITS
+_REVERSED_CHUNKS = [int(str(chunk).zfill(_REVERSE_CHUNK_DIGITS)[::-1]) for chunk in range(_REVERSE_CHUNK_BASE)]
+
+# 10^0 .. 10^19 as uint64, used for digit counts in the array engines.
+_POWERS_OF_TEN = np.array([10**k for k in range(20)], dtype=np.uint64) if np is not None else None
 
 def reverse_number(n):
     """
-    Reverses the digits of a number.
-    If the number is a single digit (0-9), it's treated as '0N'
-    for reversal, e.g., 9 becomes '09' which reverses to 90.
+    Reverses the digits of a number.
+    If the number is a single digit (0-9), it's treated as '0N'
+    for reversal, e.g., 9 becomes '09' which reverses to 90.
+    """
+    if n < CHUNKED_REVERSE_LIMIT:
+        return _reverse_number_by_chunks(n)
+    return _reverse_by_string(n)
+
+def _reverse_number_by_chunks(n):
+    """
+    Arithmetic version of reverse_number for small n: peels off 4-digit
+    chunks with divmod and reverses each through _REVERSED_CHUNKS, with no
+    string allocation. Only the leading chunk can be narrower than 4
+    digits, so its reversal is shifted back down by the missing places.
+    """
+    if n < 10:
+        # Treat single digit 'X' as '0X' for the purpose of reversal
+        return n * 10
+    result = 0
+    while n >= _REVERSE_CHUNK_BASE:
+        n, chunk = divmod(n, _REVERSE_CHUNK_BASE)
+        result = result * _REVERSE_CHUNK_BASE + _REVERSED_CHUNKS[chunk]
+    if n < 100:
+        width = 1 if n < 10 else 2
+    else:
+        width = 3 if n < 1000 else 4
+    missing = 10 ** (_REVERSE_CHUNK_DIGITS - width)
+    return result * 10**width + _REVERSED_CHUNKS[n] // missing
+
+def _reverse_by_string(n):
+    """The str() path of reverse_number, used from CHUNKED_REVERSE_LIMIT up."""
+    s = str(n)
+    if len(s) == 1:
+        # Treat single digit 'X' as '0X' for the purpose of reversal
+        s_to_reverse = "0" + s  # e.g., "9" becomes "09"
+    else:
+        s_to_reverse = s
+    return int(s_to_reverse[::-1]) # Reverse the string and convert back to int
+
+def calibrate_reverse_number(max_digits=1000, samples=1000):
+    """
+    Times the chunked and str() reversals on random numbers of 1 to
+    max_digits digits and sets CHUNKED_REVERSE_LIMIT to the first width
+    from which str() is clearly faster: by at least 5% at that width and
+    the next two measured widths. Single timings are noisy enough that a
+    one-off win would move the limit from run to run. Both give the same
+    results, so this only affects speed.
+
+    Returns:
+        The number of digits up to which the chunked path is now used.
+    """
+    global CHUNKED_REVERSE_LIMIT
+    rng = random.Random(0)
+    widths = sorted({*range(1, min(max_digits, 20) + 1), *range(25, max_digits + 1, 25), max_digits})
+    crossover = max_digits + 1
+    string_wins = []
+    for width in widths:
+        numbers = [rng.randrange(10 ** (width - 1), 10**width) for _ in range(samples)]
+        timings = []
+        for reverse in (_reverse_number_by_chunks, _reverse_by_string):
+            best = None
+            for _ in range(5):
+                started = time.perf_counter()
+                for n in numbers:
+                    reverse(n)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+        if timings[1] < 0.95 * timings[0]:
+            string_wins.append(width)
+            if len(string_wins) == 3:
+                crossover = string_wins[0]
+                break
+        else:
+            string_wins = []
+    CHUNKED_REVERSE_LIMIT = 10 ** (crossover - 1)
+    return crossover - 1
+
+def get_canonical_loop(loop_list):
+    """
+    Converts a list representing a loop into a canonical tuple form.
+    The canonical form starts with the smallest element of the loop
+    and maintains the order. E.g., [63, 27, 9] -> (9, 63, 27)
+    """
+    if not loop_list:
+        return tuple() # Should ideally not happen if a loop is found
+
+    min_val = min(loop_list)
+    min_idx = loop_list.index(min_val)
+    
+    # Rotate the list so that it starts with the minimum value
+    canonical_loop_list = loop_list[min_idx:] + loop_list[:min_idx]
+    return tuple(canonical_loop_list)
+
+class TrajectoryMemo:
+    """
+    Bounded memo mapping numbers to the canonical loop they end in.
+
+    Entries are kept in two generations. When the current generation
+    reaches max_size entries it becomes the previous one and the old
+    previous generation is dropped. A hit in the previous generation
+    promotes the entry back into the current one, so frequently reached
+    numbers survive evictions while memory stays below 2 * max_size entries.
+    """
+
+    def __init__(self, max_size=DEFAULT_MEMO_SIZE):
+        if max_size < 1:
+            raise ValueError("Memo size must be a positive integer.")
+        self.max_size = max_size
+        self._current = {}
+        self._previous = {}
+
+    def __len__(self):
+        return len(self._current) + len(self._previous)
+
+    def __contains__(self, number):
+        return number in self._current or number in self._previous
+
+    def get(self, number, default=None):
+        """Returns the known loop for number, or default if it is not stored."""
+        loop = self._current.get(number)
+        if loop is None:
+            loop = self._previous.get(number)
+            if loop is None:
+                return default
+            self.store(number, loop)
+        return loop
+
+    def store(self, number, loop):
+        """Records that number ends in the given canonical loop."""
+        self._current[number] = loop
+        if len(self._current) >= self.max_size:
+            self._previous = self._current
+            self._current = {}
+
+class RangeCheckpoint:
+    """
+    Completed sub-ranges and partial loop counts of a long range run.
+
+    Counts are only ever added together with the sub-range they came from,
+    and save() replaces the file atomically, so the file always holds a
+    consistent state. A run resumed from it walks exactly the numbers that
+    are not counted yet, whether the interrupted run used one process or
+    several.
+    """
+
+    def __init__(self, path, start_range, end_range, show_tail_lengths=False):
+        self.path = path
+        self.start_range = start_range
+        self.end_range = end_range
+        self.show_tail_lengths = show_tail_lengths
+        self.completed = []  # Sorted, non-touching [start, end) pairs
+        self.loop_frequencies = collections.defaultdict(int)
+        self.tail_histograms = {} if show_tail_lengths else None
+        self._last_saved = time.monotonic()
+
+    @classmethod
+    def load(cls, path, start_range, end_range, show_tail_lengths=False):
+        """Reads a checkpoint file, which must belong to the same range and options."""
+        with open(path) as f:
+            data = json.load(f)
+        if (data["start_range"], data["end_range"], data["show_tail_lengths"]) != (
+                start_range, end_range, show_tail_lengths):
+            raise ValueError(f"{path} belongs to a different range or different options.")
+        checkpoint = cls(path, start_range, end_range, show_tail_lengths)
+        checkpoint.completed = [tuple(interval) for interval in data["completed"]]
+        for loop, count in data["loop_frequencies"]:
+            checkpoint.loop_frequencies[tuple(loop)] = count
+        if show_tail_lengths:
+            for loop, histogram in data["tail_histograms"]:
+                checkpoint.tail_histograms[tuple(loop)] = dict(histogram)
+        return checkpoint
+
+    @property
+    def processed_count(self):
+        return sum(end - start for start, end in self.completed)
+
+    def remaining(self):
+        """Returns the [start, end) sub-ranges that are not counted yet."""
+        gaps = []
+        cursor = self.start_range
+        for start, end in self.completed:
+            if cursor < start:
+                gaps.append((cursor, start))
+            cursor = end
+        if cursor <= self.end_range:
+            gaps.append((cursor, self.end_range + 1))
+        return gaps
+
+    def record(self, chunk_start, chunk_end, loop_frequencies, tail_histograms=None):
+        """Adds the counts of [chunk_start, chunk_end) and marks it as completed."""
+        for loop, count in loop_frequencies.items():
+            self.loop_frequencies[loop] += count
+        if self.tail_histograms is not None:
+            for loop, chunk_histogram in tail_histograms.items():
+                histogram = self.tail_histograms.setdefault(loop, {})
+                for tail_length, count in chunk_histogram.items():
+                    histogram[tail_length] = histogram.get(tail_length, 0) + count
+
+        merged = []
+        for start, end in sorted(self.completed + [(chunk_start, chunk_end)]):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self.completed = merged
+
+    def save(self):
+        """Writes the checkpoint to a temporary file and moves it over the old one."""
+        if self.path is None:
+            return
+        data = {
+            "start_range": self.start_range,
+            "end_range": self.end_range,
+            "show_tail_lengths": self.show_tail_lengths,
+            "completed": self.completed,
+            "loop_frequencies": [[list(loop), count] for loop, count in self.loop_frequencies.items()],
+        }
+        if self.tail_histograms is not None:
+            data["tail_histograms"] = [[list(loop), sorted(histogram.items())]
+                                       for loop, histogram in self.tail_histograms.items()]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        temporary = tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False)
+        try:
+            with temporary:
+                json.dump(data, temporary)
+                temporary.flush()
+                os.fsync(temporary.fileno())
+            os.replace(temporary.name, self.path)
+        except BaseException:
+            os.unlink(temporary.name)
+            raise
+        self._last_saved = time.monotonic()
+
+    def save_if_due(self):
+        """Saves the checkpoint when CHECKPOINT_SECONDS have passed since the last save."""
+        if time.monotonic() - self._last_saved >= CHECKPOINT_SECONDS:
+            self.save()
+
+def checkpoint_filename(start_range, end_range):
+    """Returns the name of the checkpoint file of a range run, next to its reports."""
+    return f"loop_analysis_{start_range}_to_{end_range}.checkpoint.json"
+
+def _estimated_digit_count(n):
+    """Cheap digit count estimate for huge integers (may be one too small)."""
+    return int(n.bit_length() * 0.30102999566398120) + 1
+
+def find_ending_loop_brent(initial_number, attractors=None):
+    """
+    Finds the canonical loop of a number with Brent's cycle detection,
+    storing only a constant number of values while walking. This matters
+    for starting numbers with thousands of digits, where keeping every
+    intermediate value would dominate memory.
+
+    Args:
+        initial_number: The starting non-negative integer.
+        attractors: Optional attractor set that ends the walk early.
+
+    Returns:
+        A tuple representing the canonical form of the detected loop.
+    """
+    if not isinstance(initial_number, int) or initial_number < 0:
+        raise ValueError("Input must be a non-negative integer.")
+
+    def step(n):
+        reversed_num = reverse_number(n)
+        return n - reversed_num if n > reversed_num else reversed_num - n
+
+    # The hare moves one step at a time; the tortoise teleports to it at
+    # every power of two, so once both are on the cycle the hare catches
+    # the tortoise within one lap.
+    power = cycle_length = 1
+    tortoise = initial_number
+    hare = step(initial_number)
+    while tortoise != hare:
+        if attractors is not None and hare in attractors:
+            return attractors[hare]
+        if power == cycle_length:
+            tortoise = hare
+            power *= 2
+            cycle_length = 0
+        hare = step(hare)
+        cycle_length += 1
+
+    if attractors is not None and hare in attractors:
+        return attractors[hare]
+    loop_list = [hare]
+    for _ in range(cycle_length - 1):
+        loop_list.append(step(loop_list[-1]))
+    return get_canonical_loop(loop_list)
+
+def _int_to_digit_string(n):
+    """
+    Converts a non-negative integer to its ASCII decimal digits without
+    hitting the int/str conversion limit, by splitting it in halves.
+    """
+    if n.bit_length() <= DIGIT_ARRAY_THRESHOLD * 3:
+        return str(n).encode()
+    half = _estimated_digit_count(n) // 2
+    high, low = divmod(n, 10 ** half)
+    return _int_to_digit_string(high) + _int_to_digit_string(low).rjust(half, b"0")
+
+def _digit_string_to_int(digits):
+    """Inverse of _int_to_digit_string."""
+    if len(digits) <= DIGIT_ARRAY_THRESHOLD:
+        return int(digits)
+    half = len(digits) // 2
+    return _digit_string_to_int(digits[:-half]) * 10 ** half + _digit_string_to_int(digits[-half:])
+
+def _subtract_digit_strings(larger, smaller):
+    """
+    Subtracts two ASCII digit strings (larger >= smaller) with one borrow
+    pass over fixed-width limbs, from the least significant end.
+    """
+    smaller = smaller.rjust(len(larger), b"0")
+    limbs = []
+    borrow = 0
+    for end in range(len(larger), 0, -_LIMB_DIGITS):
+        start = max(0, end - _LIMB_DIGITS)
+        limb = int(larger[start:end]) - int(smaller[start:end]) - borrow
+        borrow = limb < 0
+        if borrow:
+            limb += 10 ** (end - start)
+        limbs.append(b"%0*d" % (end - start, limb))
+    limbs.reverse()
+    return b"".join(limbs).lstrip(b"0") or b"0"
+
+def _digit_string_step(digits):
+    """
+    Applies one reverse-subtract step to an ASCII digit string. Reversal is
+    a slice, with trailing zeros of the original dropped as leading zeros
+    and single digits treated as '0N'.
+    """
+    if len(digits) == 1:
+        reversed_digits = (digits + b"0").lstrip(b"0") or b"0"
+    else:
+        reversed_digits = digits[::-1].lstrip(b"0") or b"0"
+    if (len(digits), digits) >= (len(reversed_digits), reversed_digits):
+        return _subtract_digit_strings(digits, reversed_digits)
+    return _subtract_digit_strings(reversed_digits, digits)
+
+def find_ending_loop_digits(initial_number, attractors=None):
+    """
+    Finds the canonical loop of a very large number by walking it as an
+    ASCII digit string, so no step needs str(n) or int(s) on the whole
+    value. Cycles are found with Brent's algorithm, as in
+    find_ending_loop_brent, so only a few values are kept at a time.
+
+    Args:
+        initial_number: The starting non-negative integer, or its decimal
+                        digits as a str or bytes (for inputs too long to
+                        parse with int()).
+        attractors: Optional attractor set that ends the walk early.
+
+    Returns:
+        A tuple representing the canonical form of the detected loop.
+    """
+    if isinstance(initial_number, int):
+        if initial_number < 0:
+            raise ValueError("Input must be a non-negative integer.")
+        digits = _int_to_digit_string(initial_number)
+    else:
+        digits = initial_number.encode() if isinstance(initial_number, str) else bytes(initial_number)
+        if not digits.isdigit():
+            raise ValueError("Input must be a non-negative integer.")
+        digits = digits.lstrip(b"0") or b"0"
+
+    # Attractor keys are ints, so only values short enough to be one of
+    # them are converted and looked up.
+    attractor_digits = max((len(str(member)) for member in attractors), default=0) if attractors else 0
+
+    def known_loop(value):
+        if len(value) <= attractor_digits:
+            return attractors.get(int(value))
+        return None
+
+    power = cycle_length = 1
+    tortoise = digits
+    hare = _digit_string_step(digits)
+    while tortoise != hare:
+        loop = known_loop(hare)
+        if loop is not None:
+            return loop
+        if power == cycle_length:
+            tortoise = hare
+            power *= 2
+            cycle_length = 0
+        hare = _digit_string_step(hare)
+        cycle_length += 1
+
+    loop = known_loop(hare)
+    if loop is not None:
+        return loop
+    loop_list = [hare]
+    for _ in range(cycle_length - 1):
+        loop_list.append(_digit_string_step(loop_list[-1]))
+    return get_canonical_loop([_digit_string_to_int(value) for value in loop_list])
+
+def _normalize_runs(runs):
+    """
+    Merges neighbouring runs of the same digit, drops empty runs and
+    leading zeros, and returns the runs as a tuple of (digit, count)
+    pairs, most significant first. Zero is ((0, 1),).
+    """
+    normalized = []
+    for digit, count in runs:
+        if count == 0 or (digit == 0 and not normalized):
+            continue
+        if normalized and normalized[-1][0] == digit:
+            normalized[-1] = (digit, normalized[-1][1] + count)
+        else:
+            normalized.append((digit, count))
+    return tuple(normalized) or ((0, 1),)
+
+def runs_from_digits(digits):
+    """
+    Run-length encodes a decimal digit string (or an int) as a tuple of
+    (digit, count) pairs, most significant first: '1220' -> ((1, 1), (2, 2), (0, 1)).
+    """
+    runs = []
+    for character in str(digits):
+        digit = ord(character) - 48
+        if runs and runs[-1][0] == digit:
+            runs[-1] = (digit, runs[-1][1] + 1)
+        else:
+            runs.append((digit, 1))
+    return _normalize_runs(runs)
+
+def _runs_to_int(runs):
+    """Expands runs back into an int (only sensible for modest lengths)."""
+    return _digit_string_to_int("".join(str(digit) * count for digit, count in runs).encode())
+
+def _run_length(runs):
+    """Number of digits in a run-length encoded number."""
+    return sum(count for _, count in runs)
+
+def _reverse_runs(runs):
+    """Run-length counterpart of reverse_number."""
+    if runs[0][1] == 1 and len(runs) == 1:
+        # Treat single digit 'X' as '0X' for the purpose of reversal
+        return _normalize_runs([(runs[0][0], 1), (0, 1)])
+    return _normalize_runs(reversed(runs))
+
+def _paired_runs(first, second):
+    """
+    Yields (digit_in_first, digit_in_second, count) for the stretches where
+    both run lists hold a constant digit. Both must have the same length.
+    """
+    first = iter(first)
+    second = iter(second)
+    digit_a, left_a = next(first)
+    digit_b, left_b = next(second)
+    while True:
+        count = min(left_a, left_b)
+        yield digit_a, digit_b, count
+        left_a -= count
+        left_b -= count
+        if not left_a:
+            next_run = next(first, None)
+            if next_run is None:
+                return
+            digit_a, left_a = next_run
+        if not left_b:
+            digit_b, left_b = next(second)
+
+def _compare_runs(first, second):
+    """Returns -1, 0 or 1 as the first run-length number is <, == or > the second."""
+    length_a = _run_length(first)
+    length_b = _run_length(second)
+    if length_a != length_b:
+        return -1 if length_a < length_b else 1
+    for digit_a, digit_b, _ in _paired_runs(first, second):
+        if digit_a != digit_b:
+            return -1 if digit_a < digit_b else 1
+    return 0
+
+def _subtract_runs(larger, smaller):
+    """
+    Subtracts two run-length encoded numbers, larger >= smaller, a stretch
+    at a time from the least significant end. Within a stretch where both
+    digits are constant, only the first digit sees the incoming borrow;
+    every later digit sees the same borrow, so each stretch gives at most
+    two runs of the result.
+    """
+    padding = _run_length(larger) - _run_length(smaller)
+    if padding:
+        smaller = ((0, padding),) + smaller
+    result = []
+    borrow = 0
+    for digit_a, digit_b, count in _paired_runs(reversed(larger), reversed(smaller)):
+        value = digit_a - digit_b - borrow
+        borrow = 1 if value < 0 else 0
+        result.append((value + 10 * borrow, 1))
+        if count > 1:
+            value = digit_a - digit_b - borrow
+            borrow = 1 if value < 0 else 0
+            result.append((value + 10 * borrow, count - 1))
+    return _normalize_runs(reversed(result))
+
+def _run_step(runs):
+    """One reverse-subtract step on a run-length encoded number."""
+    reversed_runs = _reverse_runs(runs)
+    if _compare_runs(runs, reversed_runs) >= 0:
+        return _subtract_runs(runs, reversed_runs)
+    return _subtract_runs(reversed_runs, runs)
+
+def _long_run_index(runs):
+    """
+    Index of the run that is at least 2 digits longer than all the other
+    runs together, or None if there is no such run.
+    """
+    total = _run_length(runs)
+    for index, (_, count) in enumerate(runs):
+        if 2 * count - total >= 2:
+            return index
+    return None
+
+def _skip_run_drift(runs):
+    """
+    Fast-forwards a walk through stretches where it only eats into one
+    long run. Write a number as P d^c Q, with the run d^c longer than P and
+    Q together. The runs of d in it and in its reversal then overlap, and
+    the step does the same thing to the digits around the overlap whatever
+    c is, so it gives P' e^(c+delta) Q' with P', Q' and delta independent
+    of c. When a whole stretch of steps returns to the same shape with a
+    shorter long run, the stretch is repeated as many times as the long
+    runs along it stay long, in one jump.
+
+    Returns:
+        A tuple (runs, steps): the number reached by the last jump and how
+        many steps it is from the start. Every number skipped over is
+        followed by a shorter one with the same shape, so none of them is
+        in the loop. The walk after the last jump is left to the caller.
+    """
+    steps = 0
+    seen = {}
+    margins = []
+    jumped_runs, jumped_steps = runs, 0
+    while True:
+        index = _long_run_index(runs)
+        if index is None:
+            return jumped_runs, jumped_steps
+        digit, count = runs[index]
+        shape = runs[:index] + ((digit, None),) + runs[index + 1:]
+        margins.append(2 * count - _run_length(runs))
+        previous = seen.get(shape)
+        if previous is None:
+            seen[shape] = (steps, count, len(margins) - 1)
+        else:
+            first_step, first_count, first_margin = previous
+            shrink = first_count - count
+            if shrink <= 0:
+                # The same number again: a loop, which Brent's search handles
+                return jumped_runs, jumped_steps
+            # Each repeat shortens the long run of every state in the
+            # stretch by shrink, and their margins by 2 * shrink.
+            repeats = (min(margins[first_margin:]) - 2) // (2 * shrink)
+            if repeats > 0:
+                runs = runs[:index] + ((digit, count - repeats * shrink),) + runs[index + 1:]
+                steps += repeats * (steps - first_step)
+                jumped_runs, jumped_steps = runs, steps
+                seen.clear()
+                margins.clear()
+                continue
+            seen[shape] = (steps, count, len(margins) - 1)
+        runs = _run_step(runs)
+        steps += 1
+
+def find_ending_loop_runs(runs):
+    """
+    Walks a run-length encoded number (see runs_from_digits) and returns
+    the loop it ends in, without ever expanding it into digits. Each step
+    costs time proportional to the number of runs, and stretches where the
+    walk just shortens one long run step after step are skipped over in
+    one go (see _skip_run_drift). Members of families whose runs stay few
+    (repdigits, a*10^k + b, 10^k - b) are then handled in about the same
+    time whatever k is. Numbers whose runs break up into single digits get
+    no faster than a plain walk.
+
+    Cycles are found with Brent's algorithm, then the walk is repeated to
+    count the steps taken before the loop is entered.
+
+    Args:
+        runs: Tuple of (digit, count) pairs, most significant first.
+
+    Returns:
+        A tuple (loop, tail_length). loop holds the run-length encoded
+        loop members, starting at the smallest, so that
+        tuple(_runs_to_int(member) for member in loop) is the loop
+        find_ending_loop_for_number would give.
+    """
+    runs, skipped = _skip_run_drift(_normalize_runs(runs))
+    power = cycle_length = 1
+    tortoise = runs
+    hare = _run_step(runs)
+    while tortoise != hare:
+        if power == cycle_length:
+            tortoise = hare
+            power *= 2
+            cycle_length = 0
+        hare = _run_step(hare)
+        cycle_length += 1
+
+    # Start a second walker cycle_length steps ahead; they first meet at
+    # the entry into the loop.
+    tortoise = hare = runs
+    for _ in range(cycle_length):
+        hare = _run_step(hare)
+    tail_length = 0
+    while tortoise != hare:
+        tortoise = _run_step(tortoise)
+        hare = _run_step(hare)
+        tail_length += 1
+
+    members = [hare]
+    for _ in range(cycle_length - 1):
+        members.append(_run_step(members[-1]))
+    smallest = 0
+    for index in range(1, len(members)):
+        if _compare_runs(members[index], members[smallest]) < 0:
+            smallest = index
+    return tuple(members[smallest:] + members[:smallest]), skipped + tail_length
+
+def repdigit_family(digit):
+    """Family k -> the k-digit repdigit ddd...d, as runs."""
+    return lambda k: _normalize_runs([(digit, k)])
+
+def shifted_sum_family(a, b):
+    """Family k -> a*10^k + b, as runs. Needs b < 10^k."""
+    head = runs_from_digits(a)
+    tail = str(b)
+
+    def family(k):
+        if len(tail) > k:
+            raise ValueError(f"{b} does not fit below 10^{k}.")
+        return _normalize_runs(head + ((0, k - len(tail)),) + runs_from_digits(tail))
+    return family
+
+def power_of_ten_minus_family(b=1):
+    """Family k -> 10^k - b, as runs. Needs 1 <= b < 10^k; b=1 gives 99...9."""
+    width = len(str(b))
+    tail = str(10**width - b).zfill(width)
+
+    def family(k):
+        if width > k:
+            raise ValueError(f"{b} does not fit below 10^{k}.")
+        return _normalize_runs(((9, k - width),) + runs_from_digits(tail))
+    return family
+
+if numba is not None:
+    # cache=True keeps the compiled kernels in __pycache__, so they are
+    # only compiled on the first run on a machine.
+
+    @numba.njit(cache=True)
+    def _jit_step(n):
+        """reverse_number and the subtraction on an int64."""
+        if n < 10:
+            # Treat single digit 'X' as '0X' for the purpose of reversal
+            reversed_num = n * 10
+        else:
+            reversed_num = 0
+            remaining = n
+            while remaining > 0:
+                reversed_num = reversed_num * 10 + remaining % 10
+                remaining //= 10
+        return n - reversed_num if n > reversed_num else reversed_num - n
+
+    @numba.njit(cache=True)
+    def _jit_loop_members(n):
+        """Brent's search as in find_ending_loop_brent; returns the loop in walk order."""
+        power = 1
+        cycle_length = 1
+        tortoise = n
+        hare = _jit_step(n)
+        while tortoise != hare:
+            if power == cycle_length:
+                tortoise = hare
+                power *= 2
+                cycle_length = 0
+            hare = _jit_step(hare)
+            cycle_length += 1
+        members = np.empty(cycle_length, dtype=np.int64)
+        members[0] = hare
+        for index in range(1, cycle_length):
+            members[index] = _jit_step(members[index - 1])
+        return members
+
+    @numba.njit(cache=True)
+    def _jit_fill_cascade(solved, first, last):
+        """
+        Sets solved[k] = (smallest member of the loop 9k ends in) // 9 for
+        first <= k < last, in increasing k. Entries below first must be
+        filled already, so a walk stops at the first value below 9k.
+        """
+        for k in range(first, last):
+            n = 9 * k
+            power = 1
+            cycle_length = 1
+            tortoise = n
+            hare = _jit_step(n)
+            while tortoise != hare and hare >= n:
+                if power == cycle_length:
+                    tortoise = hare
+                    power *= 2
+                    cycle_length = 0
+                hare = _jit_step(hare)
+                cycle_length += 1
+            if hare < n:
+                # Every value after the first step is a multiple of 9
+                solved[k] = solved[hare // 9]
+                continue
+            minimum = hare
+            current = _jit_step(hare)
+            while current != hare:
+                minimum = min(minimum, current)
+                current = _jit_step(current)
+            solved[k] = minimum // 9
+
+    @numba.njit(cache=True)
+    def _jit_image_steps(start, count, stride):
+        """successor(stride * n) // 9 for n in start .. start + count - 1."""
+        steps = np.empty(count, dtype=np.int64)
+        for index in range(count):
+            steps[index] = _jit_step(stride * (start + index)) // 9
+        return steps
+
+    @numba.njit(cache=True)
+    def _jit_count_labels(start, count, labels, label_counts):
+        """Adds the label of each first step of start .. start + count - 1 to label_counts."""
+        for index in range(count):
+            label_counts[labels[_jit_step(start + index) // 9]] += 1
+
+    @numba.njit(cache=True)
+    def _jit_loop_minimums(start, count):
+        """The smallest loop member reached from each of start .. start + count - 1."""
+        minimums = np.empty(count, dtype=np.int64)
+        for index in range(count):
+            minimums[index] = _jit_loop_members(start + index).min()
+        return minimums
+
+def iterate_trajectory(initial_number, max_steps=None, stop=None, memo=None, attractors=None):
+    """
+    Lazily yields the reverse-subtract process of a number as
+    (step, current, reversed, next) records, one per step.
+
+    The walk ends after the record whose next number was already visited,
+    which closes the loop, or before a number found in memo or attractors.
+    It is cut off after max_steps records, or after the first record for
+    which stop(record) is true. Only the visited numbers are kept, so long
+    trajectories can be streamed without building a list of records.
+
+    Args:
+        initial_number: The starting non-negative integer.
+        max_steps: Optional maximum number of records to yield.
+        stop: Optional predicate called with each record.
+        memo: Optional TrajectoryMemo whose known numbers end the walk.
+        attractors: Optional attractor set whose members end the walk.
+
+    Returns:
+        The generator's return value is the canonical loop, or None when
+        the walk was cut off before its loop was known.
+    """
+    if not isinstance(initial_number, int) or initial_number < 0:
+        raise ValueError("Input must be a non-negative integer.")
+
+    seen_steps = {}
+    current_number = initial_number
+    step = 0
+    while max_steps is None or step < max_steps:
+        known_loop = None
+        if attractors is not None:
+            known_loop = attractors.get(current_number)
+        if known_loop is None and memo is not None:
+            known_loop = memo.get(current_number)
+        if known_loop is not None:
+            return known_loop
+
+        seen_steps[current_number] = step
+        reversed_num = reverse_number(current_number)
+        next_number = abs(current_number - reversed_num)
+        record = (step, current_number, reversed_num, next_number)
+        yield record
+
+        if next_number in seen_steps:
+            # Dicts keep insertion order, so the loop is everything visited
+            # since its first member.
+            loop_start = seen_steps[next_number]
+            return get_canonical_loop([number for number, number_step in seen_steps.items()
+                                       if number_step >= loop_start])
+        if stop is not None and stop(record):
+            return None
+        current_number = next_number
+        step += 1
+    return None
+
+def _report_trajectory(initial_number, write_line, memo=None, attractors=None):
+    """
+    Walks a number with iterate_trajectory and passes the step-by-step
+    description to write_line one line at a time.
+
+    Returns:
+        A tuple (canonical_loop, sequence) with the numbers visited in order.
+    """
+    write_line(f"\nProcessing number: {initial_number}")
+    write_line("-" * 20)
+
+    walk = iterate_trajectory(initial_number, memo=memo, attractors=attractors)
+    sequence = []
+    current_number = initial_number
+    while True:
+        try:
+            step, current_number, reversed_num, next_number = next(walk)
+        except StopIteration as walk_end:
+            canonical_form = walk_end.value
+            break
+        sequence.append(current_number)
+        write_line(f"  Step {step}: Current = {current_number}")
+        write_line(f"    Reversed = {reversed_num} (single digits 'N' treated as '0N' for reversal)")
+        if current_number == reversed_num:
+            write_line(f"    {current_number} == {reversed_num}, next = 0")
+        elif current_number > reversed_num:
+            write_line(f"    {current_number} - {reversed_num} = {next_number}")
+        else:
+            write_line(f"    {reversed_num} - {current_number} = {next_number}")
+        current_number = next_number
+
+    if current_number in sequence:
+        loop_start_index = sequence.index(current_number)
+        write_line(f"  Loop detected. Current number {current_number} was first seen at sequence index {loop_start_index}.")
+        write_line(f"  Raw loop sequence: {sequence[loop_start_index:]}")
+    elif attractors is not None and current_number in attractors:
+        write_line(f"  Reached {current_number}, which is a member of a known loop.")
+    else:
+        write_line(f"  Reached {current_number}, which is already known to end in this loop.")
+    write_line(f"  Canonical loop: {list(canonical_form)}")
+    write_line("-" * 20)
+    return canonical_form, sequence
+
+def find_ending_loop_for_number(initial_number, verbose=False, memo=None, attractors=None):
+    """
+    Performs the reverse-subtract-repeat process for a single number
+    and returns the canonical form of the loop it enters.
+
+    Args:
+        initial_number: The starting non-negative integer.
+        verbose: If True, prints step-by-step calculations.
+        memo: Optional TrajectoryMemo shared between calls. The walk stops
+              as soon as it reaches a number whose loop is already known,
+              and every number on the new path is recorded in it.
+        attractors: Optional dict mapping loop members to their canonical
+                    loop (see build_attractor_set). The walk stops at the
+                    first loop member instead of going around the loop.
+
+    Non-verbose calls on numbers with more than BRENT_DIGIT_THRESHOLD digits
+    use find_ending_loop_brent instead, and those with more than
+    DIGIT_ARRAY_THRESHOLD digits use find_ending_loop_digits. When Numba is
+    installed, non-verbose calls on numbers below JIT_LIMIT run in a
+    compiled kernel instead. None of these update the memo.
+
+    Returns:
+        A tuple representing the canonical form of the detected loop.
+    """
+    if not isinstance(initial_number, int) or initial_number < 0:
+        raise ValueError("Input must be a non-negative integer.")
+
+    if not verbose:
+        if numba is not None and initial_number < JIT_LIMIT:
+            return get_canonical_loop(_jit_loop_members(initial_number).tolist())
+        estimated_digits = _estimated_digit_count(initial_number)
+        if estimated_digits > DIGIT_ARRAY_THRESHOLD:
+            return find_ending_loop_digits(initial_number, attractors=attractors)
+        if estimated_digits > BRENT_DIGIT_THRESHOLD:
+            return find_ending_loop_brent(initial_number, attractors=attractors)
+
+    if verbose:
+        canonical_form, sequence = _report_trajectory(initial_number, print, memo=memo, attractors=attractors)
+    else:
+        seen_numbers = {}  # Stores number: index_in_sequence
+        sequence = []
+        current_number = initial_number
+        known_loop = None
+
+        while current_number not in seen_numbers:
+            if attractors is not None:
+                known_loop = attractors.get(current_number)
+                if known_loop is not None:
+                    break
+            if memo is not None:
+                known_loop = memo.get(current_number)
+                if known_loop is not None:
+                    break
+
+            seen_numbers[current_number] = len(sequence) # Record index before appending
+            sequence.append(current_number)
+            current_number = abs(current_number - reverse_number(current_number))
+
+        if known_loop is not None:
+            canonical_form = known_loop
+        else:
+            canonical_form = get_canonical_loop(sequence[seen_numbers[current_number]:])
+
+    if memo is not None:
+        for number in sequence:
+            # Every value after the first step is a multiple of 9, so other
+            # starting numbers can never be reached again and would only
+            # crowd out useful entries.
+            if number % 9 == 0:
+                memo.store(number, canonical_form)
+
+    return canonical_form
+
+def _require_numpy(feature):
+    """Raises ImportError with a clear message when NumPy is missing."""
+    if np is None:
+        raise ImportError(f"NumPy is required for {feature}.")
+
+def reverse_numbers_array(values):
+    """
+    Batch counterpart of reverse_number: reverses the digits of every entry
+    of an integer array at once, without going through str().
+
+    Each value is reversed as if padded to the widest digit count in the
+    array, then the padding is divided back out using the value's own digit
+    count. This drops trailing zeros (120 -> 21) and keeps the single-digit
+    rule (9 -> 90), so the result matches reverse_number element-wise.
+
+    Args:
+        values: Array-like of non-negative integers below 10^19 (larger
+                uint64 values can reverse past 2^64).
+
+    Returns:
+        A uint64 NumPy array of the reversed values.
+    """
+    _require_numpy("reverse_numbers_array")
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return values.copy()
+    if values.max() >= _POWERS_OF_TEN[19]:
+        raise ValueError("reverse_numbers_array only supports values below 10^19.")
+
+    digit_counts = np.searchsorted(_POWERS_OF_TEN, values, side="right")
+    np.maximum(digit_counts, 1, out=digit_counts)
+    reversed_values = _reverse_padded_array(values, digit_counts)
+
+    # Treat single digit 'X' as '0X' for the purpose of reversal
+    ten = np.uint64(10)
+    return np.where(values < ten, values * ten, reversed_values)
+
+def _reverse_padded_array(values, widths):
+    """
+    Reverses each uint64 value as a string of exactly widths[i] digits
+    (leading zeros included, so 12 at width 4 gives 2100 // 100 = 21 and
+    1200 gives 21 too). widths may be 0, which gives 0.
+    """
+    max_width = int(widths.max()) if widths.size else 0
+    ten = np.uint64(10)
+    remaining = values.copy()
+    reversed_values = np.zeros_like(values)
+    for _ in range(max_width):
+        remaining, digit = np.divmod(remaining, ten)
+        reversed_values *= ten
+        reversed_values += digit
+    reversed_values //= _POWERS_OF_TEN[max_width - widths]
+    return reversed_values
+
+def _successor_array(values):
+    """Applies one reverse-subtract step to every entry of a uint64 array."""
+    reversed_values = reverse_numbers_array(values)
+    return np.maximum(values, reversed_values) - np.minimum(values, reversed_values)
+
+def successor_table_digits(end_range):
+    """
+    Returns the digit count of the smallest decade [0, 10^d) that contains
+    end_range and is closed under the reverse-subtract step (d >= 2).
+    """
+    return max(2, len(str(end_range)))
+
+def build_successor_table(num_digits):
+    """
+    Builds the successor array next[n] = |n - reverse_number(n)| for every
+    n in [0, 10^num_digits) using vectorized NumPy arithmetic.
+
+    A whole decade is closed under the step, so every entry is itself a
+    valid index into the table.
+
+    Args:
+        num_digits: Number of digits covered by the table (at least 2,
+                    since 9 -> 81 leaves the single-digit decade).
+
+    Returns:
+        A uint32 (or uint64 for very large tables) NumPy array.
+    """
+    _require_numpy("successor tables")
+    if num_digits < 2:
+        raise ValueError("Successor tables need at least 2 digits to be closed under the step.")
+
+    limit = 10 ** num_digits
+    dtype = np.uint32 if limit <= 2**32 else np.uint64
+    table = np.empty(limit, dtype=dtype)
+    for chunk_start in range(0, limit, TABLE_CHUNK_SIZE):
+        chunk_end = min(chunk_start + TABLE_CHUNK_SIZE, limit)
+        values = np.arange(chunk_start, chunk_end, dtype=np.uint64)
+        table[chunk_start:chunk_end] = _successor_array(values)
+    return table
+
+def build_image_successor_table(num_digits):
+    """
+    Builds the successor table restricted to the image of the step.
+
+    Every value after the first step is a multiple of 9 (n and its reverse
+    have the same digit sum), so only multiples of 9 are ever looked up.
+    Entry k describes the number 9k and holds successor(9k) // 9. The table
+    is 9x smaller than build_successor_table's for the same decade.
+
+    Args:
+        num_digits: Number of digits of the decade covered (at least 2).
+
+    Returns:
+        A uint32 (or uint64 for very large tables) NumPy array of length
+        (10^num_digits - 1) // 9 + 1.
+    """
+    _require_numpy("successor tables")
+    if num_digits < 2:
+        raise ValueError("Successor tables need at least 2 digits to be closed under the step.")
+
+    size = (10 ** num_digits - 1) // 9 + 1
+    dtype = np.uint32 if size <= 2**32 else np.uint64
+    table = np.empty(size, dtype=dtype)
+    nine = np.uint64(9)
+    for chunk_start in range(0, size, TABLE_CHUNK_SIZE):
+        chunk_end = min(chunk_start + TABLE_CHUNK_SIZE, size)
+        values = np.arange(chunk_start, chunk_end, dtype=np.uint64) * nine
+        table[chunk_start:chunk_end] = _successor_array(values) // nine
+    return table
+
+def _image_table_limit(image_successor):
+    """Returns 10^d for the decade an image successor table covers."""
+    return 9 * (len(image_successor) - 1) + 1
+
+def _as_index_array(successor):
+    """Returns the table in a dtype np.bincount accepts without copying."""
+    if successor.dtype == np.uint64:
+        return successor.view(np.int64)  # entries are far below 2^63
+    return successor
+
+def _peel_to_cycles(successor):
+    """
+    Peels off nodes that no other node points to, round by round (Kahn's
+    algorithm), until only the cycles remain.
+
+    Returns:
+        A tuple (peel_rounds, cycle_members). Replaying peel_rounds backwards
+        visits every tree node after its successor.
+    """
+    size = len(successor)
+    indegree = np.bincount(successor, minlength=size).astype(np.uint32)
+    peel_rounds = []
+    frontier = np.flatnonzero(indegree == 0)
+    while frontier.size:
+        peel_rounds.append(frontier)
+        targets, counts = np.unique(successor[frontier], return_counts=True)
+        indegree[targets] -= counts.astype(np.uint32)
+        frontier = targets[indegree[targets] == 0]
+    return peel_rounds, np.flatnonzero(indegree)
+
+def _label_cycles(successor, cycle_members, labels, scale):
+    """
+    Walks each cycle once, writes its loop ID into labels for all of its
+    members and returns the list of canonical loops indexed by ID. Table
+    index k stands for the number scale * k.
+    """
+    loops = []
+    for member in cycle_members.tolist():
+        if labels[member] >= 0:
+            continue
+        loop_list = [member]
+        current = int(successor[member])
+        while current != member:
+            loop_list.append(current)
+            current = int(successor[current])
+        labels[loop_list] = len(loops)
+        loops.append(get_canonical_loop([scale * index for index in loop_list]))
+    return loops
+
+def label_basins(successor, scale=1):
+    """
+    Labels every node of the functional graph n -> successor[n] with the
+    loop it ends in, in one linear pass over the table.
+
+    Nodes that no other node points to are peeled off round by round
+    (Kahn's algorithm) until only the cycles remain. Each cycle is then
+    walked once to get its canonical form, and the peeled rounds are
+    replayed backwards so that every node inherits the label of its
+    successor. Every node is visited a constant number of times.
+
+    Args:
+        successor: A closed successor table, e.g. from build_successor_table.
+        scale: Number represented by table index 1; 9 for tables from
+               build_image_successor_table.
+
+    Returns:
+        A tuple (labels, loops, cycle_members): labels[k] is an index into
+        loops, loops is a list of canonical loop tuples of numbers, and
+        cycle_members is a sorted array of the table indices on a loop.
+    """
+    _require_numpy("basin labeling")
+    successor = _as_index_array(successor)
+    peel_rounds, cycle_members = _peel_to_cycles(successor)
+
+    labels = np.full(len(successor), -1, dtype=np.int32)
+    loops = _label_cycles(successor, cycle_members, labels, scale)
+
+    # The last round peeled sits right next to the cycles, so replaying
+    # the rounds backwards always finds the successor already labeled.
+    for frontier in reversed(peel_rounds):
+        labels[frontier] = labels[successor[frontier]]
+    return labels, loops, cycle_members
+
+def label_image_by_cascade(num_digits, show_progress=False):
+    """
+    Gives the same labels as label_basins on the image successor table of
+    num_digits digits, filling them one digit length at a time in a
+    compiled kernel instead of building the table.
+
+    Multiples of 9 are solved in increasing order, so by the time 9k is
+    reached every smaller multiple of 9 (all shorter numbers included) is
+    solved, and its walk stops at the first value below 9k. Most steps
+    shrink the number, so most of these walks are one or two steps long.
+    Without Numba the labels come from label_basins instead.
+
+    Args:
+        num_digits: Number of digits of the decade covered (at least 2).
+        show_progress: Whether to print a line after each digit length.
+
+    Returns:
+        A tuple (labels, loops): labels[k] is the index in loops of the
+        loop that 9k ends in, and loops is a list of canonical loop tuples.
+    """
+    _require_numpy("decade labeling")
+    if numba is None or 10 ** num_digits > JIT_LIMIT:
+        labels, loops, _ = label_basins(build_image_successor_table(num_digits), scale=9)
+        return labels, loops
+    if num_digits < 2:
+        raise ValueError("Decade labeling needs at least 2 digits to be closed under the step.")
+
+    size = (10 ** num_digits - 1) // 9 + 1
+    solved = np.empty(size, dtype=np.uint32 if size <= 2**32 else np.uint64)
+    decade_start = 0
+    for digits in range(1, num_digits + 1):
+        decade_end = (10 ** digits - 1) // 9 + 1
+        _jit_fill_cascade(solved, decade_start, decade_end)
+        if show_progress:
+            print(f"  Solved all multiples of 9 with up to {digits} digits...")
+        decade_start = decade_end
+
+    # Each loop's smallest member is the only entry that points to itself.
+    # Entries are turned into loop indices in place, chunk by chunk.
+    loop_minimums = np.concatenate([
+        chunk_start + np.flatnonzero(solved[chunk_start:chunk_start + TABLE_CHUNK_SIZE]
+                                     == np.arange(chunk_start, min(chunk_start + TABLE_CHUNK_SIZE, size)))
+        for chunk_start in range(0, size, TABLE_CHUNK_SIZE)])
+    loops = [find_ending_loop_for_number(9 * int(minimum)) for minimum in loop_minimums]
+    for chunk_start in range(0, size, TABLE_CHUNK_SIZE):
+        chunk = solved[chunk_start:chunk_start + TABLE_CHUNK_SIZE]
+        chunk[:] = np.searchsorted(loop_minimums, chunk)
+    return solved, loops
+
+def basin_statistics(successor, scale=1):
+    """
+    Like label_basins, but also records for every node how many steps it
+    takes to enter its loop and which loop member it enters at. Both come
+    out of the same reverse-topological replay, so they cost one extra
+    array write per node.
+
+    Args:
+        successor: A closed successor table, e.g. from build_successor_table.
+        scale: Number represented by table index 1, as for label_basins.
+
+    Returns:
+        A tuple (labels, loops, tail_lengths, entry_points). Entry points are
+        table indices; loop members have a tail length of 0 and are their
+        own entry point.
+    """
+    _require_numpy("basin statistics")
+    successor = _as_index_array(successor)
+    peel_rounds, cycle_members = _peel_to_cycles(successor)
+    size = len(successor)
+
+    labels = np.full(size, -1, dtype=np.int32)
+    loops = _label_cycles(successor, cycle_members, labels, scale)
+
+    tail_dtype = np.uint16 if len(peel_rounds) < 2**16 else np.uint32
+    tail_lengths = np.zeros(size, dtype=tail_dtype)
+    entry_points = np.zeros(size, dtype=successor.dtype)
+    entry_points[cycle_members] = cycle_members
+
+    for frontier in reversed(peel_rounds):
+        targets = successor[frontier]
+        labels[frontier] = labels[targets]
+        tail_lengths[frontier] = tail_lengths[targets] + 1
+        entry_points[frontier] = entry_points[targets]
+    return labels, loops, tail_lengths, entry_points
+
+def find_loop_entry_for_number(initial_number):
+    """
+    Walks a single number and returns (canonical_loop, tail_length,
+    entry_point): the loop it ends in, the number of steps taken before
+    reaching the loop, and the first loop member reached.
+    """
+    if not isinstance(initial_number, int) or initial_number < 0:
+        raise ValueError("Input must be a non-negative integer.")
+
+    seen_numbers = {}
+    sequence = []
+    current_number = initial_number
+    while current_number not in seen_numbers:
+        seen_numbers[current_number] = len(sequence)
+        sequence.append(current_number)
+        current_number = abs(current_number - reverse_number(current_number))
+
+    tail_length = seen_numbers[current_number]
+    return get_canonical_loop(sequence[tail_length:]), tail_length, current_number
+
+class JumpTables:
+    """
+    Binary-lifting tables over a closed successor table: level j maps every
+    table index to the index 2^j steps later. The k-th iterate of a number
+    then takes one lookup per set bit of k, and the step at which it enters
+    its loop is found by a binary search over the levels, so every query is
+    O(log k) array lookups however many numbers are asked at once.
+
+    Each level is built from the one below it with a single vectorized
+    gather. Levels are added on demand, and there are always enough of them
+    to cover the longest tail of the table.
+    """
+
+    def __init__(self, successor, scale=1, max_steps=0):
+        """
+        Args:
+            successor: A closed successor table, e.g. from
+                       build_image_successor_table.
+            scale: Number represented by table index 1, as for label_basins.
+            max_steps: Largest iterate expected; levels for it are built
+                       up front instead of on the first query.
+        """
+        _require_numpy("jump tables")
+        successor = _as_index_array(successor)
+        peel_rounds, cycle_members = _peel_to_cycles(successor)
+        # Every round peels one more step of the longest tail
+        self.max_tail_length = len(peel_rounds)
+        self.scale = scale
+        self.limit = _image_table_limit(successor) if scale == 9 else len(successor)
+        self.on_cycle = np.zeros(len(successor), dtype=bool)
+        self.on_cycle[cycle_members] = True
+        self.cycle_labels = np.full(len(successor), -1, dtype=np.int32)
+        self.loops = _label_cycles(successor, cycle_members, self.cycle_labels, scale)
+        self.levels = [successor]
+        self._extend(max(self.max_tail_length, max_steps))
+
+    def _extend(self, steps):
+        """Adds levels until every step count up to steps can be jumped."""
+        while 2 ** len(self.levels) <= steps:
+            previous = self.levels[-1]
+            self.levels.append(previous[previous])
+
+    def _iterate_indices(self, indices, steps):
+        self._extend(steps)
+        for level, table in enumerate(self.levels):
+            if steps >> level & 1:
+                indices = table[indices]
+        return indices
+
+    def _first_steps(self, numbers):
+        """Returns the table indices of the successors of numbers."""
+        numbers = np.asarray(numbers, dtype=np.uint64)
+        if numbers.size and int(numbers.max()) >= self.limit:
+            raise ValueError("The jump tables do not cover the requested numbers.")
+        return numbers, _successor_array(numbers) // np.uint64(self.scale)
+
+    def iterate(self, numbers, steps):
+        """
+        Returns the number each of numbers reaches after the given number of
+        steps, as a uint64 array.
+        """
+        if steps < 0:
+            raise ValueError("The number of steps must be non-negative.")
+        numbers, first_steps = self._first_steps(numbers)
+        if steps == 0:
+            return numbers
+        indices = self._iterate_indices(first_steps, steps - 1)
+        return indices.astype(np.uint64) * np.uint64(self.scale)
+
+    def enter_loop(self, numbers):
+        """
+        Returns (tail_lengths, entry_points) for each of numbers, as
+        find_loop_entry_for_number does for one: the steps taken before the
+        loop is reached and the first loop member reached.
+        """
+        numbers, current = self._first_steps(numbers)
+        tail_lengths = np.ones(current.shape, dtype=np.int64)
+        # Jump as far as possible while staying off the loop; the walk then
+        # sits one step before the loop unless it started on it.
+        for level in reversed(range(len(self.levels))):
+            jumped = self.levels[level][current]
+            outside = ~self.on_cycle[jumped]
+            current = np.where(outside, jumped, current)
+            tail_lengths += outside.astype(np.int64) << level
+        outside = ~self.on_cycle[current]
+        current = np.where(outside, self.levels[0][current], current)
+        tail_lengths += outside
+
+        scale = np.uint64(self.scale)
+        entry_points = current.astype(np.uint64) * scale
+        # Loop members are already in their loop, so they have no tail
+        members = (numbers % scale == 0) & self.on_cycle[numbers // scale]
+        tail_lengths[members] = 0
+        entry_points[members] = numbers[members]
+        return tail_lengths, entry_points
+
+    def loop_ids(self, numbers):
+        """Returns, for each of numbers, the index in self.loops of the loop it ends in."""
+        _, first_steps = self._first_steps(numbers)
+        return self.cycle_labels[self._iterate_indices(first_steps, self.max_tail_length)]
+
+def count_loops_with_successor_table(start_range, end_range, successor=None, show_progress=False,
+                                     tail_histograms=None):
+    """
+    Counts how many numbers in [start_range, end_range] end in each loop,
+    answering everything from a successor table instead of per-number walks.
+
+    The first step of each number is computed directly; everything after it
+    is looked up in the labels of the image table, which only covers
+    multiples of 9. Without a table or tail histograms, the labels come
+    from label_image_by_cascade and no table is built.
+
+    Args:
+        start_range: Starting number of the range
+        end_range: Ending number of the range
+        successor: Optional table from build_image_successor_table covering
+                   the range; built on demand when omitted
+        show_progress: Whether to print a progress line after each chunk
+        tail_histograms: Optional dict, filled with
+                         loop -> {tail_length: count} for the range
+
+    Returns:
+        A dict mapping canonical loop tuples to their frequencies.
+    """
+    _require_numpy("the successor table engine")
+    if successor is not None and end_range >= _image_table_limit(successor):
+        raise ValueError("The successor table does not cover the requested range.")
+
+    if tail_histograms is None and successor is None:
+        labels, loops = label_image_by_cascade(successor_table_digits(end_range))
+    elif tail_histograms is None:
+        labels, loops, _ = label_basins(successor, scale=9)
+    else:
+        if successor is None:
+            successor = build_image_successor_table(successor_table_digits(end_range))
+        labels, loops, tail_lengths, _ = basin_statistics(successor, scale=9)
+        on_cycle = np.zeros(len(successor), dtype=bool)
+        on_cycle[[number // 9 for loop in loops for number in loop]] = True
+        tail_bins = int(tail_lengths.max()) + 2
+        pair_counts = np.zeros(len(loops) * tail_bins, dtype=np.int64)
+
+    nine = np.uint64(9)
+    total_numbers_to_process = end_range - start_range + 1
+    label_counts = np.zeros(len(loops), dtype=np.int64)
+    for chunk_start in range(start_range, end_range + 1, TABLE_CHUNK_SIZE):
+        chunk_end = min(chunk_start + TABLE_CHUNK_SIZE - 1, end_range)
+        if tail_histograms is None and numba is not None and end_range < JIT_LIMIT:
+            _jit_count_labels(chunk_start, chunk_end - chunk_start + 1, labels, label_counts)
+        else:
+            numbers = np.arange(chunk_start, chunk_end + 1, dtype=np.uint64)
+            first_steps = _successor_array(numbers) // nine
+            # A number ends in the same loop as its successor
+            chunk_labels = labels[first_steps]
+            label_counts += np.bincount(chunk_labels, minlength=len(loops))
+        if tail_histograms is not None:
+            chunk_tails = tail_lengths[first_steps].astype(np.int64) + 1
+            # Loop members are already in their loop, so they have no tail
+            members = np.flatnonzero(numbers % nine == 0)
+            members = members[on_cycle[numbers[members] // nine]]
+            chunk_tails[members] = 0
+            pairs = chunk_labels.astype(np.int64) * tail_bins + chunk_tails
+            pair_counts += np.bincount(pairs, minlength=len(pair_counts))
+        if show_progress:
+            current_processed_count = chunk_end - start_range + 1
+            print(f"  Processed {current_processed_count}/{total_numbers_to_process} numbers (up to {chunk_end})...")
+
+    if tail_histograms is not None:
+        for label, histogram in enumerate(pair_counts.reshape(len(loops), tail_bins).tolist()):
+            if any(histogram):
+                tail_histograms[loops[label]] = {
+                    tail_length: count for tail_length, count in enumerate(histogram) if count}
+
+    return {loops[label]: count for label, count in enumerate(label_counts.tolist()) if count}
+
+def _labeling_table_limit(tail_lengths=False):
+    """
+    Returns the largest image table whose labeling fits the memory budget:
+    peeling needs far more memory than the Numba cascade, and tail lengths
+    always need peeling.
+    """
+    if numba is None or tail_lengths:
+        return MAX_PEELED_TABLE_SIZE
+    return MAX_SUCCESSOR_TABLE_SIZE
+
+def _successor_table_pays_off(start_range, end_range, tail_lengths=False):
+    """
+    Decides whether the 'auto' engine should build a successor table: the
+    table has to fit the limit of the labeling that will run on it, and
+    the range has to cover a sizeable part of it.
+    """
+    if np is None:
+        return False
+    decade_size = 10 ** successor_table_digits(end_range)
+    table_size = decade_size // 9 + 1
+    return table_size <= _labeling_table_limit(tail_lengths) and (end_range - start_range + 1) * 10 >= decade_size
+
+def _pair_difference_counts(leading):
+    """
+    Returns sorted (difference, count) pairs: for each value of a - b, how
+    many ways a mirrored digit pair (a, b) produces it. The leading pair's
+    first digit cannot be 0.
+    """
+    first_digits = range(1, 10) if leading else range(10)
+    counts = collections.Counter(a - b for a in first_digits for b in range(10))
+    return sorted(counts.items())
+
+def _signature_sums(weights, pair_counts):
+    """
+    Combines mirrored pairs into a dict mapping each partial sum
+    sum(difference_i * weight_i) to the number of digit choices giving it.
+    """
+    sums = {0: 1}
+    for weight, counts in zip(weights, pair_counts):
+        combined = collections.defaultdict(int)
+        for partial_sum, multiplicity in sums.items():
+            for difference, count in counts:
+                combined[partial_sum + difference * weight] += multiplicity * count
+        sums = combined
+    return sums
+
+def count_loops_for_digit_length(num_digits, memo=None, show_progress=False, attractors=None):
+    """
+    Counts exactly how many num_digits-digit numbers end in each loop,
+    without enumerating the numbers themselves.
+
+    For a number with digits a_0 .. a_(d-1), n - reverse(n) equals
+    sum((a_i - a_(d-1-i)) * (10^(d-1-i) - 10^i)) over the mirrored pairs,
+    so the first step only depends on the pair differences (the signature).
+    Each signature is walked once from its successor and credited with the
+    number of digit strings producing it. The leading pairs and the inner
+    pairs are combined separately. The inner sums are symmetric around 0, so
+    outer sums s and -s give the same successors and only s >= 0 is walked.
+    That is at most about 19^(d/2) / 2 walks instead of 9 * 10^(d-1).
+
+    Args:
+        num_digits: The digit length to count (1 counts 0-9).
+        memo: Optional TrajectoryMemo shared by the walks.
+        show_progress: Whether to print progress lines.
+        attractors: Optional attractor set that ends walks early.
+
+    Returns:
+        A dict mapping canonical loop tuples to their frequencies.
+    """
+    if not isinstance(num_digits, int) or num_digits < 1:
+        raise ValueError("Digit length must be a positive integer.")
+    loop_frequencies = collections.defaultdict(int)
+    if num_digits == 1:
+        for i in range(10):
+            loop_frequencies[find_ending_loop_for_number(i, memo=memo, attractors=attractors)] += 1
+        return loop_frequencies
+
+    pair_count = num_digits // 2
+    weights = [10 ** (num_digits - 1 - i) - 10 ** i for i in range(pair_count)]
+    pair_counts = [_pair_difference_counts(leading=True)] + [_pair_difference_counts(leading=False)] * (pair_count - 1)
+    middle_choices = 10 if num_digits % 2 else 1
+
+    outer_pairs = (pair_count + 1) // 2
+    outer_sums = _signature_sums(weights[:outer_pairs], pair_counts[:outer_pairs])
+    inner_sums = list(_signature_sums(weights[outer_pairs:], pair_counts[outer_pairs:]).items())
+
+    folded_outer_sums = collections.defaultdict(int)
+    for outer_sum, multiplicity in outer_sums.items():
+        folded_outer_sums[abs(outer_sum)] += multiplicity * middle_choices
+    folded_outer_sums = sorted(folded_outer_sums.items())
+
+    total_groups = len(folded_outer_sums)
+    for group_index, (outer_sum, outer_multiplicity) in enumerate(folded_outer_sums, start=1):
+        for inner_sum, inner_multiplicity in inner_sums:
+            loop = find_ending_loop_for_number(abs(outer_sum + inner_sum), memo=memo, attractors=attractors)
+            loop_frequencies[loop] += outer_multiplicity * inner_multiplicity
+        if show_progress and (group_index % (total_groups // 10 + 1) == 0 or group_index == total_groups):
+            print(f"  Processed {group_index}/{total_groups} signature groups "
+                  f"({group_index * len(inner_sums)} signatures)...")
+    return loop_frequencies
+
+def build_attractor_set(max_digits):
+    """
+    Finds every loop reached by numbers with up to max_digits digits and
+    maps each loop member to its canonical loop.
+
+    Any loop reached from below 10^max_digits lies entirely below it, so
+    these are exactly the cycles of that decade. They are read off the
+    image successor table when NumPy is available and it fits in memory, and
+    otherwise collected with the signature counting engine.
+
+    Args:
+        max_digits: Largest digit length covered.
+
+    Returns:
+        A dict mapping each loop member to its canonical loop tuple.
+    """
+    if not isinstance(max_digits, int) or max_digits < 1:
+        raise ValueError("Digit length must be a positive integer.")
+
+    table_digits = max(2, max_digits)
+    if np is not None and (10 ** table_digits - 1) // 9 + 1 <= _labeling_table_limit():
+        _, loops = label_image_by_cascade(table_digits)
+    else:
+        memo = TrajectoryMemo()
+        loops = set()
+        for num_digits in range(1, max_digits + 1):
+            loops.update(count_loops_for_digit_length(num_digits, memo=memo))
+    return {member: loop for loop in loops for member in loop}
+
+def save_attractor_set(attractors, filename=DEFAULT_ATTRACTOR_FILE):
+    """Writes an attractor set to a JSON file as a list of its loops."""
+    loops = sorted(set(attractors.values()))
+    with open(filename, 'w') as f:
+        json.dump({"loops": [list(loop) for loop in loops]}, f)
+
+def load_attractor_set(filename=DEFAULT_ATTRACTOR_FILE):
+    """Reads an attractor set written by save_attractor_set."""
+    with open(filename) as f:
+        loops = json.load(f)["loops"]
+    return {member: tuple(loop) for loop in loops for member in loop}
+
+def _digit_matrix_step(digits):
+    """
+    Applies one reverse-subtract step to every row of a digit matrix.
+
+    Each row holds one number as int8 digits, most significant first and
+    right-aligned with leading zeros. Reversal and comparison work on the
+    whole matrix at once and the borrow pass runs column by column, so the
+    Python-level loop is over digit positions, never over numbers.
+    """
+    rows, width = digits.shape
+    columns = np.arange(width)
+
+    nonzero = digits != 0
+    first_digit = np.where(nonzero.any(axis=1), nonzero.argmax(axis=1), width - 1)
+
+    # A row whose digits start at column f reads column c from column
+    # (width - 1 + f - c), and is 0 left of f.
+    source = (width - 1 + first_digit)[:, None] - columns
+    np.clip(source, 0, width - 1, out=source)
+    reversed_digits = np.take_along_axis(digits, source, axis=1)
+    reversed_digits[columns < first_digit[:, None]] = 0
+    # Treat single digit 'X' as '0X' for the purpose of reversal
+    single = np.flatnonzero(first_digit == width - 1)
+    reversed_digits[single, width - 2] = digits[single, width - 1]
+    reversed_digits[single, width - 1] = 0
+
+    # Rows are right-aligned, so the first differing column decides which
+    # of the two is larger; flipping the sign makes every row larger - smaller.
+    difference = digits - reversed_digits
+    deciding = difference[np.arange(rows), (difference != 0).argmax(axis=1)]
+    difference *= np.where(deciding < 0, -1, 1).astype(np.int8)[:, None]
+
+    result = np.empty_like(difference)
+    borrow = np.zeros(rows, dtype=np.int8)
+    for column in range(width - 1, -1, -1):
+        value = difference[:, column] - borrow
+        borrow = (value < 0).view(np.int8)
+        result[:, column] = value + 10 * borrow
+    return result
+
+def _digit_row_to_int(row):
+    """Converts one row of a digit matrix back to an int."""
+    return _digit_string_to_int((row + 48).astype(np.uint8).tobytes().lstrip(b"0") or b"0")
+
+def _digit_rows(digit_strings, width):
+    """Stacks ASCII digit strings into a right-aligned int8 digit matrix."""
+    joined = b"".join(value.rjust(width, b"0") for value in digit_strings)
+    return (np.frombuffer(joined, dtype=np.uint8) - 48).astype(np.int8).reshape(-1, width)
+
+def find_ending_loops_batch(numbers, attractors=None):
+    """
+    Finds the canonical loop of many starting numbers at once by advancing
+    all of them in lockstep, one step per iteration, as rows of a 2-D digit
+    matrix. Meant for numbers too wide for uint64 and too many to walk one
+    by one in Python.
+
+    Every row runs its own Brent cycle detection with vectorized
+    bookkeeping. Once some row has found a loop, its members are
+    fingerprinted, and any row reaching one of them stops right there (the
+    match is confirmed exactly before it is used). Finished rows are
+    dropped from the matrix. When every number is below 10^38 the work is
+    handed to find_ending_loops_two_limb, which is faster at those widths.
+
+    Args:
+        numbers: Iterable of non-negative integers.
+        attractors: Optional attractor set whose loops are known up front.
+
+    Returns:
+        A list with the canonical loop tuple of each number, in order.
+    """
+    _require_numpy("the batch walker")
+    numbers = list(numbers)
+    if any(not isinstance(n, int) or n < 0 for n in numbers):
+        raise ValueError("Input must be a non-negative integer.")
+    if not numbers:
+        return []
+
+    if max(numbers) < TWO_LIMB_LIMIT:
+        return find_ending_loops_two_limb(numbers, attractors)
+
+    digit_strings = [_int_to_digit_string(n) for n in numbers]
+    width = max(2, max(len(value) for value in digit_strings))
+
+    def member_rows(members):
+        members = [member for member in members if len(str(member)) <= width]
+        return _digit_rows([str(member).encode() for member in members], width)
+
+    return _find_loops_in_lockstep(_digit_rows(digit_strings, width), _digit_matrix_step,
+                                   _digit_row_to_int, member_rows, attractors)
+
+def _find_loops_in_lockstep(state, step, row_to_int, member_rows, attractors):
+    """
+    Lockstep Brent cycle detection shared by the batch walkers.
+
+    Args:
+        state: 2-D array holding one starting number per row.
+        step: Function applying one reverse-subtract step to every row.
+        row_to_int: Function turning one row back into an int.
+        member_rows: Function turning a list of ints into rows, dropping
+                     the ones the representation cannot hold.
+        attractors: Optional attractor set whose loops are known up front.
+
+    Returns:
+        A list with the canonical loop tuple of each row, in order.
+    """
+    # Random weights turn each row into a 64-bit fingerprint (int64
+    # arithmetic wraps around), used to spot rows sitting on a known loop.
+    weights = np.random.default_rng(0).integers(-2**62, 2**62, size=state.shape[1])
+
+    def fingerprint(rows):
+        return rows.astype(np.int64) @ weights
+
+    known_loops = {}
+    known_fingerprints = np.empty(0, dtype=np.int64)
+
+    def learn(loops):
+        nonlocal known_fingerprints
+        known_loops.update((member, loop) for loop in loops for member in loop)
+        rows = member_rows([member for loop in loops for member in loop])
+        if len(rows):
+            known_fingerprints = np.union1d(known_fingerprints, fingerprint(rows))
+
+    if attractors:
+        learn(set(attractors.values()))
+
+    # n ends in the same loop as its successor, and neighbouring starting
+    # numbers often share one, so the search runs on distinct successors.
+    state, inverse = np.unique(step(state), axis=0, return_inverse=True)
+    count = len(state)
+    results = [None] * count
+    positions = np.arange(count)
+    tortoise = state
+    hare = step(tortoise)
+    power = np.ones(count, dtype=np.int64)
+    cycle_length = np.ones(count, dtype=np.int64)
+
+    while positions.size:
+        finished = (hare == tortoise).all(axis=1)
+        for row in np.flatnonzero(finished).tolist():
+            member = row_to_int(hare[row])
+            loop = known_loops.get(member)
+            if loop is None:
+                loop = find_ending_loop_for_number(member)
+                learn([loop])
+            results[positions[row]] = loop
+
+        for row in np.flatnonzero(~finished & np.isin(fingerprint(hare), known_fingerprints)).tolist():
+            loop = known_loops.get(row_to_int(hare[row]))
+            if loop is not None:
+                results[positions[row]] = loop
+                finished[row] = True
+
+        remaining = ~finished
+        positions = positions[remaining]
+        tortoise = tortoise[remaining]
+        hare = hare[remaining]
+        power = power[remaining]
+        cycle_length = cycle_length[remaining]
+
+        restart = power == cycle_length
+        tortoise[restart] = hare[restart]
+        power[restart] *= 2
+        cycle_length[restart] = 0
+
+        hare = step(hare)
+        cycle_length += 1
+
+    return [results[row] for row in inverse.reshape(-1).tolist()]
+
+def _two_limb_step(limbs):
+    """
+    Applies one reverse-subtract step to every row of a two-limb array.
+
+    Row i holds the number limbs[i, 0] * 10^19 + limbs[i, 1]. When the high
+    limb has k digits, the reversal is the low limb reversed over all 19 of
+    its digit places, shifted left by k digits, plus the high limb reversed
+    over its k digits; the shift is split back across the two limbs. The
+    subtraction borrows 10^19 from the high limb explicitly.
+    """
+    high = limbs[:, 0]
+    low = limbs[:, 1]
+
+    high_digits = np.searchsorted(_POWERS_OF_TEN, high, side="right")
+    low_digits = np.searchsorted(_POWERS_OF_TEN, low, side="right")
+    np.maximum(low_digits, 1, out=low_digits)
+    low_width = np.where(high > 0, 19, low_digits)
+
+    reversed_low = _reverse_padded_array(low, low_width)
+    reversed_high = _reverse_padded_array(high, high_digits)
+    split = _POWERS_OF_TEN[19 - high_digits]
+    new_high = reversed_low // split
+    new_low = reversed_low % split * _POWERS_OF_TEN[high_digits] + reversed_high
+    # Treat single digit 'X' as '0X' for the purpose of reversal
+    ten = np.uint64(10)
+    single = (high == 0) & (low < ten)
+    new_low[single] = low[single] * ten
+
+    larger = (high > new_high) | ((high == new_high) & (low >= new_low))
+    big_high = np.where(larger, high, new_high)
+    big_low = np.where(larger, low, new_low)
+    small_high = np.where(larger, new_high, high)
+    small_low = np.where(larger, new_low, low)
+
+    result = np.empty_like(limbs)
+    borrow = big_low < small_low
+    # uint64 arithmetic wraps, so adding the base back fixes a borrowed limb
+    result[:, 1] = big_low - small_low + np.where(borrow, _POWERS_OF_TEN[19], np.uint64(0))
+    result[:, 0] = big_high - small_high - borrow.astype(np.uint64)
+    return result
+
+def _limb_rows(numbers):
+    """Splits ints below 10^38 into an (n, 2) uint64 array of (high, low) limbs."""
+    return np.array([divmod(n, 10**19) for n in numbers], dtype=np.uint64).reshape(-1, 2)
+
+def _limb_row_to_int(row):
+    """Joins one (high, low) limb row back into an int."""
+    return int(row[0]) * 10**19 + int(row[1])
+
+def find_ending_loops_two_limb(numbers, attractors=None):
+    """
+    Finds the canonical loop of many numbers below 10^38 at once, holding
+    each as two uint64 limbs in base 10^19 and running the same lockstep
+    search as find_ending_loops_batch. Numbers of 20 to 38 digits overflow
+    a single uint64 but fit here, and every step stays in fixed-width
+    NumPy arithmetic.
+
+    Args:
+        numbers: Iterable of non-negative integers below 10^38.
+        attractors: Optional attractor set whose loops are known up front.
+
+    Returns:
+        A list with the canonical loop tuple of each number, in order.
+    """
+    _require_numpy("the two-limb walker")
+    numbers = list(numbers)
+    if any(not isinstance(n, int) or n < 0 for n in numbers):
+        raise ValueError("Input must be a non-negative integer.")
+    if any(n >= TWO_LIMB_LIMIT for n in numbers):
+        raise ValueError("The two-limb walker only supports numbers below 10^38.")
+    if not numbers:
+        return []
+
+    def member_rows(members):
+        return _limb_rows([member for member in members if member < TWO_LIMB_LIMIT])
+
+    return _find_loops_in_lockstep(_limb_rows(numbers), _two_limb_step, _limb_row_to_int,
+                                   member_rows, attractors)
+
+def _count_loops_with_jit(start_range, end_range, show_progress=True):
+    """
+    Walks every number in [start_range, end_range] in the compiled kernel,
+    TABLE_CHUNK_SIZE numbers per call, and returns a dict of loop
+    frequencies. The kernel only reports the smallest member of each loop,
+    which identifies it; each distinct loop is then expanded once.
+    """
+    loop_frequencies = collections.defaultdict(int)
+    total_numbers_to_process = end_range - start_range + 1
+    for chunk_start in range(start_range, end_range + 1, TABLE_CHUNK_SIZE):
+        chunk_end = min(chunk_start + TABLE_CHUNK_SIZE - 1, end_range)
+        minimums, counts = np.unique(_jit_loop_minimums(chunk_start, chunk_end - chunk_start + 1),
+                                     return_counts=True)
+        for minimum, count in zip(minimums.tolist(), counts.tolist()):
+            loop_frequencies[find_ending_loop_for_number(minimum)] += count
+        if show_progress:
+            current_processed_count = chunk_end - start_range + 1
+            print(f"  Processed {current_processed_count}/{total_numbers_to_process} numbers (up to {chunk_end})...")
+    return loop_frequencies
+
+def _count_loops_by_walking(start_range, end_range, show_individual_progress, memo_size,
+                            tail_histograms=None, dedupe_reversals=True, attractors=None, show_progress=True,
+                            memo=None):
+    """
+    Walks every number in [start_range, end_range] and returns a dict of
+    loop frequencies, printing the usual progress lines along the way.
+    When tail_histograms is a dict it is filled with
+    loop -> {tail_length: count}.
+
+    With dedupe_reversals, a number n and reverse_number(n) are walked only
+    once when both lie in the range. They have the same successor, and so
+    end in the same loop, whenever reversing n twice gives n back. That
+    fails for numbers with trailing zeros (120 -> 21 -> 12), which are then
+    walked on their own. Pairing is skipped when individual progress or
+    tail lengths are requested, since those differ between the two numbers.
+
+    When Numba is installed and neither is requested, ranges below
+    JIT_LIMIT are walked by _count_loops_with_jit instead. show_progress
+    turns off the progress lines, for walks running in worker processes.
+    A memo passed in is used instead of a new one of memo_size, so that
+    consecutive chunks of a range can share it.
+    """
+    if numba is not None and not show_individual_progress and tail_histograms is None and end_range < JIT_LIMIT:
+        return _count_loops_with_jit(start_range, end_range, show_progress)
+
+    loop_frequencies = collections.defaultdict(int)
+    total_numbers_to_process = end_range - start_range + 1
+
+    # The memo and the attractor set would cut the step-by-step output
+    # short, so they are only used when individual progress is not shown.
+    if show_individual_progress:
+        memo = None
+        attractors = None
+    elif memo is None and memo_size:
+        memo = TrajectoryMemo(memo_size)
+
+    pair_reversals = dedupe_reversals and not show_individual_progress and tail_histograms is None
+
+    for i in range(start_range, end_range + 1):
+        if pair_reversals:
+            reversed_i = reverse_number(i)
+            weight = 1
+            if reversed_i != i and start_range <= reversed_i <= end_range and reverse_number(reversed_i) == i:
+                # The smaller number of the pair is walked and credited for both
+                weight = 2 if reversed_i > i else 0
+            if weight:
+                # n ends in the same loop as its successor, so the walk can
+                # start one step in and reuse the reversal computed above
+                loop = find_ending_loop_for_number(abs(i - reversed_i), memo=memo, attractors=attractors)
+                loop_frequencies[loop] += weight
+        elif tail_histograms is not None and not show_individual_progress:
+            # One walk gives both the loop and the steps taken to reach it
+            loop, tail_length, _ = find_loop_entry_for_number(i)
+            loop_frequencies[loop] += 1
+        else:
+            # Set verbose to True here if you want to see details for each number
+            # For large ranges, it's better to keep it False.
+            loop = find_ending_loop_for_number(i, verbose=show_individual_progress, memo=memo,
+                                               attractors=attractors)
+            loop_frequencies[loop] += 1
+            if tail_histograms is not None:
+                tail_length = find_loop_entry_for_number(i)[1]
+        if tail_histograms is not None:
+            histogram = tail_histograms.setdefault(loop, {})
+            histogram[tail_length] = histogram.get(tail_length, 0) + 1
+        
+        # Progress indicator
+        if not show_progress:
+            continue
+        current_processed_count = i - start_range + 1
+        if total_numbers_to_process <= 200: # More frequent updates for small ranges
+            if current_processed_count % (total_numbers_to_process // 10 + 1) == 0 or current_processed_count == total_numbers_to_process:
+                 print(f"  Processed {current_processed_count}/{total_numbers_to_process} numbers (up to {i})...")
+        elif current_processed_count % 100 == 0 or current_processed_count == total_numbers_to_process or current_processed_count == 1 :
+            print(f"  Processed {current_processed_count}/{total_numbers_to_process} numbers (up to {i})...")
+
+    return loop_frequencies
+
+def _count_chunk(memo_size, want_tails, dedupe_reversals, attractors, chunk_start, chunk_end):
+    """
+    Walks chunk_start .. chunk_end - 1 in a worker process without progress
+    output and returns (loop_frequencies, tail_histograms) as plain dicts.
+    """
+    tail_histograms = {} if want_tails else None
+    loop_frequencies = _count_loops_by_walking(
+        chunk_start, chunk_end - 1, False, memo_size, tail_histograms=tail_histograms,
+        dedupe_reversals=dedupe_reversals, attractors=attractors, show_progress=False)
+    return dict(loop_frequencies), tail_histograms
+
+def _timed_chunk(task, chunk_start, chunk_end):
+    """Runs task(chunk_start, chunk_end) in a worker and returns (pid, seconds, result)."""
+    started = time.perf_counter()
+    result = task(chunk_start, chunk_end)
+    return os.getpid(), time.perf_counter() - started, result
+
+def _schedule_chunks(executor, task, intervals, workers, min_chunk_size, merge, show_progress=True):
+    """
+    Hands the [start, end) intervals to a process pool one chunk at a time,
+    from a cursor that moves forward as chunks are given out, and calls
+    merge(chunk_start, chunk_end, result) as soon as a chunk is done.
+
+    A worker that finishes early simply gets the next chunk, so no process
+    waits for a slow one while numbers are left. Chunk sizes follow the
+    throughput measured on finished chunks so that each takes about
+    CHUNK_TARGET_SECONDS, and shrink towards the end so that all workers
+    finish together. Two chunks per worker are kept queued so that no
+    worker waits for the next one.
+
+    Returns:
+        A tuple (usage, wall_seconds), where usage maps each worker's pid
+        to [chunks, numbers, busy_seconds].
+    """
+    intervals = [(start, end) for start, end in intervals if start < end]
+    cursor = intervals[0][0] if intervals else 0
+    chunk_size = min_chunk_size
+    rate = None
+    pending = {}
+    usage = {}
+    current_processed_count = 0
+    total_numbers_to_process = remaining = sum(end - start for start, end in intervals)
+    started = time.perf_counter()
+
+    def submit_next():
+        nonlocal cursor, remaining
+        interval_end = intervals[0][1]
+        size = min(interval_end - cursor, max(min_chunk_size, min(chunk_size, -(-remaining // workers))))
+        pending[executor.submit(_timed_chunk, task, cursor, cursor + size)] = (cursor, size)
+        cursor += size
+        remaining -= size
+        if cursor == interval_end:
+            intervals.pop(0)
+            if intervals:
+                cursor = intervals[0][0]
+
+    while intervals and len(pending) < 2 * workers:
+        submit_next()
+    while pending:
+        done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            chunk_start, size = pending.pop(future)
+            pid, seconds, result = future.result()
+            merge(chunk_start, chunk_start + size, result)
+            worker_usage = usage.setdefault(pid, [0, 0, 0.0])
+            worker_usage[0] += 1
+            worker_usage[1] += size
+            worker_usage[2] += seconds
+
+            chunk_rate = size / max(seconds, 1e-6)
+            rate = chunk_rate if rate is None else rate + 0.3 * (chunk_rate - rate)
+            chunk_size = max(min_chunk_size, int(rate * CHUNK_TARGET_SECONDS))
+            current_processed_count += size
+            if show_progress:
+                print(f"  Processed {current_processed_count}/{total_numbers_to_process} numbers "
+                      f"(chunks of about {chunk_size})...")
+            if intervals:
+                submit_next()
+    return usage, time.perf_counter() - started
+
+def _report_worker_utilization(usage, wall_seconds):
+    """Prints how many chunks and numbers each worker took and how busy it was."""
+    print(f"  Worker utilization over {wall_seconds:.2f}s:")
+    for pid, (chunks, numbers, busy_seconds) in sorted(usage.items()):
+        print(f"    Process {pid}: {chunks} chunk(s), {numbers} numbers, "
+              f"busy {busy_seconds / max(wall_seconds, 1e-9):.1%}")
+
+def _count_loops_in_workers(start_range, end_range, workers, memo_size, tail_histograms=None,
+                            dedupe_reversals=True, attractors=None, checkpoint=None):
+    """
+    Walks [start_range, end_range] in a pool of worker processes, handing
+    out chunks with _schedule_chunks, and merges their counts.
+
+    The counts do not depend on how the range is split: reversal pairs
+    that straddle two chunks are simply walked once in each. With a
+    RangeCheckpoint, only its remaining sub-ranges are walked, each
+    finished chunk is recorded in it, and it is saved as often as
+    CHECKPOINT_SECONDS allows.
+
+    Returns:
+        A dict of loop frequencies; tail_histograms, when given, is filled
+        as by _count_loops_by_walking.
+    """
+    progress = checkpoint or RangeCheckpoint(None, start_range, end_range, tail_histograms is not None)
+
+    def merge(chunk_start, chunk_end, result):
+        progress.record(chunk_start, chunk_end, *result)
+        progress.save_if_due()
+
+    task = functools.partial(_count_chunk, memo_size, tail_histograms is not None, dedupe_reversals, attractors)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        usage, wall_seconds = _schedule_chunks(executor, task, progress.remaining(), workers, 1000, merge)
+    _report_worker_utilization(usage, wall_seconds)
+    if tail_histograms is not None:
+        tail_histograms.update(progress.tail_histograms)
+    return progress.loop_frequencies
+
+def _count_loops_with_checkpoints(checkpoint, show_individual_progress, memo_size, tail_histograms=None,
+                                  dedupe_reversals=True, attractors=None):
+    """
+    Walks the remaining sub-ranges of a RangeCheckpoint in this process,
+    CHECKPOINT_CHUNK_SIZE numbers at a time, recording every chunk in it
+    and saving it as often as CHECKPOINT_SECONDS allows.
+
+    Returns:
+        A dict of loop frequencies for the whole range; tail_histograms,
+        when given, is filled as by _count_loops_by_walking.
+    """
+    memo = TrajectoryMemo(memo_size) if memo_size and not show_individual_progress else None
+    total_numbers_to_process = checkpoint.end_range - checkpoint.start_range + 1
+    for interval_start, interval_end in checkpoint.remaining():
+        for chunk_start in range(interval_start, interval_end, CHECKPOINT_CHUNK_SIZE):
+            chunk_end = min(chunk_start + CHECKPOINT_CHUNK_SIZE, interval_end)
+            chunk_tails = {} if tail_histograms is not None else None
+            chunk_frequencies = _count_loops_by_walking(
+                chunk_start, chunk_end - 1, show_individual_progress, memo_size, tail_histograms=chunk_tails,
+                dedupe_reversals=dedupe_reversals, attractors=attractors, show_progress=False, memo=memo)
+            checkpoint.record(chunk_start, chunk_end, chunk_frequencies, chunk_tails)
+            checkpoint.save_if_due()
+            print(f"  Processed {checkpoint.processed_count}/{total_numbers_to_process} numbers (up to {chunk_end - 1})...")
+    if tail_histograms is not None:
+        tail_histograms.update(checkpoint.tail_histograms)
+    return checkpoint.loop_frequencies
+
+def _shared_tables_fit(size, dtype, count=2):
     """
-    s = str(n)
-    if len(s) == 1:
-        # Treat single digit 'X' as '0X' for the purpose of reversal
-        s_to_reverse = "0" + s  # e.g., "9" becomes "09"
-    else:
-        s_to_reverse = s
-    return int(s_to_reverse[::-1]) # Reverse the string and convert back to int
+    Whether count shared arrays of size entries fit in the free space of
+    /dev/shm, which backs multiprocessing.shared_memory on Linux. Writing
+    past that space kills the process with SIGBUS instead of raising, so
+    this is checked before any block is created. Platforms without
+    /dev/shm back the blocks with ordinary memory and are not checked.
+    """
+    try:
+        stats = os.statvfs(SHARED_MEMORY_DIR)
+    except (AttributeError, OSError):
+        return True
+    return count * size * np.dtype(dtype).itemsize <= stats.f_bavail * stats.f_frsize
 
-def get_canonical_loop(loop_list):
+def _shared_table_spec(end_range):
+    """Returns (size, dtype) of the shared image tables covering end_range."""
+    size = (10 ** successor_table_digits(end_range) - 1) // 9 + 1
+    return size, (np.uint32 if size < 2**32 else np.uint64)
+
+def _create_shared_array(size, dtype):
+    """Returns (block, array): a new shared memory block and a NumPy array over it."""
+    dtype = np.dtype(dtype)
+    block = shared_memory.SharedMemory(create=True, size=max(1, size * dtype.itemsize))
+    return block, np.ndarray(size, dtype=dtype, buffer=block.buf)
+
+def _attach_shared_tables(specs):
     """
-    Converts a list representing a loop into a canonical tuple form.
-    The canonical form starts with the smallest element of the loop
-    and maintains the order. E.g., [63, 27, 9] -> (9, 63, 27)
+    Pool initializer: maps the shared blocks described by specs, a dict
+    role -> (block name, size, dtype name), into this worker process.
     """
-    if not loop_list:
-        return tuple() # Should ideally not happen if a loop is found
+    for role, (name, size, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _shared_tables[role] = (block, np.ndarray(size, dtype=np.dtype(dtype), buffer=block.buf))
 
-    min_val = min(loop_list)
-    min_idx = loop_list.index(min_val)
-    
-    # Rotate the list so that it starts with the minimum value
-    canonical_loop_list = loop_list[min_idx:] + loop_list[:min_idx]
-    return tuple(canonical_loop_list)
+def _image_steps(start, stop, stride):
+    """
+    Returns successor(stride * n) // 9 for n in [start, stop) as an int64
+    array, in the compiled kernel when Numba is installed.
+    """
+    if numba is not None and stride * stop < JIT_LIMIT:
+        return _jit_image_steps(start, stop - start, stride)
+    values = np.arange(start, stop, dtype=np.uint64) * np.uint64(stride)
+    return (_successor_array(values) // np.uint64(9)).astype(np.int64)
+
+def _fill_shared_successor(chunk_start, chunk_end):
+    """Fills entries chunk_start .. chunk_end - 1 of the shared image successor table."""
+    _shared_tables["successor"][1][chunk_start:chunk_end] = _image_steps(chunk_start, chunk_end, 9)
 
-def find_ending_loop_for_number(initial_number, verbose=False):
+def _resolve_shared_results(indices, successor, results):
     """
-    Performs the reverse-subtract-repeat process for a single number
-    and returns the canonical form of the loop it enters.
+    Makes results[k] nonzero for every image index in indices, where a
+    nonzero entry is the smallest member of the loop 9k ends in, divided
+    by 9, plus one.
+
+    All unresolved walks advance in lockstep until each reaches an entry
+    that is already known, possibly written by another process, and the
+    entries along the way are then filled backwards. Every process writes
+    the same value for the same entry, so concurrent writes are harmless.
+    """
+    frontier = np.unique(indices[results[indices] == 0])
+    rounds = []
+    while frontier.size:
+        rounds.append(frontier)
+        if len(rounds) % RESULT_CHASE_ROUNDS == 0:
+            # Walks this long go around loops nobody has recorded yet
+            for index in frontier.tolist():
+                if results[index] == 0:
+                    loop = find_ending_loop_for_number(9 * index)
+                    results[[member // 9 for member in loop]] = loop[0] // 9 + 1
+        targets = np.unique(successor[frontier])
+        frontier = targets[results[targets] == 0]
+    # Each round's successors were either known or in the next round
+    for frontier in reversed(rounds):
+        results[frontier] = results[successor[frontier]]
+
+def _count_shared_chunk(chunk_start, chunk_end):
+    """
+    Counts the loops of chunk_start .. chunk_end - 1 from the shared tables
+    and returns a dict mapping loop minimums to frequencies.
+    """
+    successor = _shared_tables["successor"][1]
+    results = _shared_tables["results"][1]
+    # A number ends in the same loop as its successor
+    first_steps = _image_steps(chunk_start, chunk_end, 1)
+    _resolve_shared_results(first_steps, successor, results)
+    minimums, counts = np.unique(results[first_steps], return_counts=True)
+    return {9 * (minimum - 1): count for minimum, count in zip(minimums.tolist(), counts.tolist())}
+
+def count_loops_with_shared_tables(start_range, end_range, workers, attractors=None, show_progress=False):
+    """
+    Counts how many numbers in [start_range, end_range] end in each loop
+    with a pool of worker processes sharing one image successor table and
+    one result table through multiprocessing.shared_memory.
+
+    The workers fill the successor table in parallel and then walk chunks
+    of the range through it, handed out by _schedule_chunks. Results are stored per multiple of 9 as
+    (smallest loop member) // 9 + 1, with 0 meaning not known yet, so a
+    walk stops as soon as it reaches a value that any process has already
+    resolved. Members of the attractor loops are written into the result
+    table up front. Memory stays at one copy of each table however many
+    workers there are, but both copies live in /dev/shm, so MemoryError
+    is raised up front when they do not fit there (see _shared_tables_fit).
 
     Args:
-        initial_number: The starting non-negative integer.
-        verbose: If True, prints step-by-step calculations.
+        start_range: Starting number of the range
+        end_range: Ending number of the range
+        workers: Number of worker processes
+        attractors: Optional attractor set whose loops are known up front
+        show_progress: Whether to print a progress line after each chunk
 
     Returns:
-        A tuple representing the canonical form of the detected loop.
+        A dict mapping canonical loop tuples to their frequencies.
     """
-    if not isinstance(initial_number, int) or initial_number < 0:
-        raise ValueError("Input must be a non-negative integer.")
+    _require_numpy("shared tables")
+    size, dtype = _shared_table_spec(end_range)
+    if not _shared_tables_fit(size, dtype):
+        raise MemoryError(f"Two {size}-entry tables do not fit in the free space of {SHARED_MEMORY_DIR}.")
+    successor_block, successor = _create_shared_array(size, dtype)
+    results_block, results = _create_shared_array(size, dtype)
+    try:
+        results[:] = 0
+        if attractors is not None:
+            for member, loop in attractors.items():
+                if member // 9 < size:
+                    results[member // 9] = loop[0] // 9 + 1
+        specs = {"successor": (successor_block.name, size, np.dtype(dtype).name),
+                 "results": (results_block.name, size, np.dtype(dtype).name)}
 
-    seen_numbers = {}  # Stores number: index_in_sequence
-    sequence = []
-    current_number = initial_number
-    step = 0
+        minimum_counts = collections.defaultdict(int)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared_tables,
+                                                    initargs=(specs,)) as executor:
+            fills = [executor.submit(_fill_shared_successor, chunk_start, min(chunk_start + TABLE_CHUNK_SIZE, size))
+                     for chunk_start in range(0, size, TABLE_CHUNK_SIZE)]
+            for fill in fills:
+                fill.result()
+            if show_progress:
+                print(f"  Built the shared successor table ({size} entries)...")
 
-    if verbose:
-        print(f"\nProcessing number: {initial_number}")
-        print("-" * 20)
+            def merge(chunk_start, chunk_end, chunk_counts):
+                for minimum, count in chunk_counts.items():
+                    minimum_counts[minimum] += count
 
-    while current_number not in seen_numbers:
-        if verbose:
-            print(f"  Step {step}: Current = {current_number}")
+            usage, wall_seconds = _schedule_chunks(executor, _count_shared_chunk, [(start_range, end_range + 1)],
+                                                   workers, 2**16, merge, show_progress)
+        if show_progress:
+            _report_worker_utilization(usage, wall_seconds)
+    finally:
+        # The arrays export the blocks' buffers and must go before closing
+        del successor, results
+        for block in (successor_block, results_block):
+            block.close()
+            block.unlink()
 
-        seen_numbers[current_number] = len(sequence) # Record index before appending
-        sequence.append(current_number)
+    return {find_ending_loop_for_number(minimum): count for minimum, count in minimum_counts.items()}
 
-        reversed_num = reverse_number(current_number)
-        if verbose:
-            print(f"    Reversed = {reversed_num} (single digits 'N' treated as '0N' for reversal)")
+def _sampling_strata(start_range, end_range):
+    """
+    Splits [start_range, end_range] into inclusive (low, high) blocks of
+    numbers sharing their digit length and first SAMPLE_LEADING_DIGITS digits.
+    """
+    strata = []
+    for digits in range(len(str(start_range)), len(str(end_range)) + 1):
+        leading = min(SAMPLE_LEADING_DIGITS, digits)
+        block_size = 10 ** (digits - leading)
+        first_prefix = 10 ** (leading - 1) if digits > 1 else 0
+        for prefix in range(first_prefix, 10 ** leading):
+            low = max(prefix * block_size, start_range)
+            high = min((prefix + 1) * block_size - 1, end_range)
+            if low <= high:
+                strata.append((low, high))
+    return strata
 
-        if current_number == reversed_num:
-            next_number = 0
-            if verbose:
-                print(f"    {current_number} == {reversed_num}, next = 0")
-        elif current_number > reversed_num:
-            next_number = current_number - reversed_num
-            if verbose:
-                print(f"    {current_number} - {reversed_num} = {next_number}")
-        else: # reversed_num > current_number
-            next_number = reversed_num - current_number
-            if verbose:
-                print(f"    {reversed_num} - {current_number} = {next_number}")
-        
-        current_number = next_number
-        step += 1
-    
-    loop_start_index = seen_numbers[current_number]
-    actual_loop_list = sequence[loop_start_index:]
-    
-    canonical_form = get_canonical_loop(actual_loop_list)
-    
-    if verbose:
-        print(f"  Loop detected. Current number {current_number} was first seen at sequence index {loop_start_index}.")
-        print(f"  Raw loop sequence: {actual_loop_list}")
-        print(f"  Canonical loop: {list(canonical_form)}")
-        print("-" * 20)
-        
-    return canonical_form
+def _find_loops_for_sample(numbers, attractors):
+    """Walks a batch of unrelated numbers with the fastest walker available for their size."""
+    largest = max(numbers)
+    compiled = numba is not None and largest < JIT_LIMIT
+    if np is not None and not compiled and largest < TWO_LIMB_LIMIT:
+        return find_ending_loops_batch(numbers, attractors)
+    # Compiled walks and numbers too wide for two limbs are faster one at a time
+    return [find_ending_loop_for_number(n, attractors=attractors) for n in numbers]
 
-def analyze_number_range(start_range, end_range, show_individual_progress=False, save_to_file=True):
+def estimate_loop_frequencies(start_range, end_range, precision=0.005, time_budget=None, seed=None,
+                              confidence=0.95, attractors=None, show_progress=False):
     """
-    Analyzes all numbers in a given range, tracks the loops they fall into,
-    and reports the frequency of each loop type.
-    
+    Estimates which share of the numbers in [start_range, end_range] ends
+    in each loop from uniformly drawn random starting numbers, for ranges
+    far too large to walk.
+
+    The range is split into strata by digit length and leading digits (see
+    _sampling_strata), and every round adds SAMPLE_BATCH_SIZE samples spread
+    over the strata in proportion to their size, with at least two per
+    stratum. The share of a loop is the size-weighted mean of its share in
+    each stratum, which has a smaller variance than plain sampling because
+    the loop a number ends in depends strongly on its length and first
+    digits. Rounds continue until every loop's confidence interval is at
+    most precision wide on each side, or until time_budget seconds have
+    passed, whichever comes first.
+
     Args:
         start_range: Starting number of the range
         end_range: Ending number of the range
-        show_individual_progress: Whether to show verbose output for each number
-        save_to_file: Whether to save results to a text file
+        precision: Target half-width of every interval, as a share
+                   (0.005 is half a percentage point); None to sample
+                   until the time budget runs out
+        time_budget: Optional number of seconds after which sampling stops
+        seed: Seed for the random numbers; the same seed draws the same
+              numbers round by round
+        confidence: Confidence level of the intervals
+        attractors: Optional attractor set passed to the walkers
+        show_progress: Whether to print a line after each round
+
+    Returns:
+        A tuple (estimates, samples) where estimates maps canonical loop
+        tuples to (share, half_width) and samples is the number drawn.
     """
-    print(f"\nAnalyzing numbers from {start_range} to {end_range}...")
-    loop_frequencies = collections.defaultdict(int)
-    total_numbers_to_process = end_range - start_range + 1
+    if precision is None and time_budget is None:
+        raise ValueError("Sampling needs a target precision or a time budget.")
+    if not 0 < confidence < 1:
+        raise ValueError("The confidence level must be between 0 and 1.")
 
-    for i in range(start_range, end_range + 1):
-        # Set verbose to True here if you want to see details for each number
-        # For large ranges, it's better to keep it False.
-        loop = find_ending_loop_for_number(i, verbose=show_individual_progress)
-        loop_frequencies[loop] += 1
+    rng = random.Random(seed)
+    strata = _sampling_strata(start_range, end_range)
+    total_numbers = end_range - start_range + 1
+    weights = [(high - low + 1) / total_numbers for low, high in strata]
+    drawn = [0] * len(strata)
+    stratum_counts = [collections.Counter() for _ in strata]
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    started = time.time()
+    target = 0
+
+    while True:
+        target += SAMPLE_BATCH_SIZE
+        numbers = []
+        owners = []
+        for index, ((low, high), weight) in enumerate(zip(strata, weights)):
+            wanted = max(2, math.ceil(weight * target)) - drawn[index]
+            numbers.extend(rng.randint(low, high) for _ in range(wanted))
+            owners.extend([index] * wanted)
+            drawn[index] += wanted
+        for index, loop in zip(owners, _find_loops_for_sample(numbers, attractors)):
+            stratum_counts[index][loop] += 1
+
+        estimates = {}
+        for loop in set().union(*stratum_counts):
+            share = variance = 0.0
+            for weight, count, counts in zip(weights, drawn, stratum_counts):
+                stratum_share = counts[loop] / count
+                share += weight * stratum_share
+                variance += weight * weight * stratum_share * (1 - stratum_share) / (count - 1)
+            estimates[loop] = (share, z * math.sqrt(variance))
+
+        samples = sum(drawn)
+        widest = max(half_width for _, half_width in estimates.values())
+        if show_progress:
+            print(f"  Sampled {samples} numbers, widest interval +/- {widest:.4%}...")
+        if precision is not None and widest <= precision:
+            break
+        if time_budget is not None and time.time() - started >= time_budget:
+            break
+    return estimates, samples
+
+def _save_summary(filename, summary_lines, header="Number Loop Analysis Results"):
+    """Writes summary lines to a results file under header and says where it went."""
+    try:
+        with open(filename, 'w') as f:
+            f.write(f"{header}\n")
+            f.write(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write("=" * 50 + "\n\n")
+            f.write("\n".join(summary_lines))
+            f.write(f"\n\n" + "=" * 50 + "\n")
+            f.write("Analysis completed successfully.\n")
         
-        # Progress indicator
-        current_processed_count = i - start_range + 1
-        if total_numbers_to_process <= 200: # More frequent updates for small ranges
-            if current_processed_count % (total_numbers_to_process // 10 + 1) == 0 or current_processed_count == total_numbers_to_process:
-                 print(f"  Processed {current_processed_count}/{total_numbers_to_process} numbers (up to {i})...")
-        elif current_processed_count % 100 == 0 or current_processed_count == total_numbers_to_process or current_processed_count == 1 :
-            print(f"  Processed {current_processed_count}/{total_numbers_to_process} numbers (up to {i})...")
+        print(f"\nResults saved to: {filename}")
+        print(f"File location: {os.path.abspath(filename)}")
+        
+    except Exception as e:
+        print(f"\nError saving to file: {e}")
+        print("Results were displayed above but not saved.")
+
+def _report_sampled_summary(start_range, end_range, estimates, samples, seed, confidence, save_to_file):
+    """
+    Prints the estimated loop shares from estimate_loop_frequencies and
+    optionally saves them to a loop_sampling text file.
+    """
+    summary_lines = []
+    summary_lines.append("--- Loop Analysis Summary (estimated by sampling) ---")
+    summary_lines.append(f"Estimate for numbers from {start_range} to {end_range}")
+    summary_lines.append(f"Random starting numbers sampled: {samples} "
+                         f"(stratified by digit length and leading digits, seed {seed})")
+    summary_lines.append(f"Found {len(estimates)} distinct loop type(s) in the sample:")
+    summary_lines.append("")
+
+    sorted_loops = sorted(estimates.items(), key=lambda item: (item[1][0], item[0]), reverse=True)
+    for loop, (share, half_width) in sorted_loops:
+        low, high = max(0.0, share - half_width), min(1.0, share + half_width)
+        summary_lines.append(f"  Loop: {list(loop)}  <-  about {share:.4%} of starting numbers "
+                             f"({confidence:.0%} interval: {low:.4%} to {high:.4%})")
+
+    summary_lines.append("")
+    summary_lines.append(f"Loops reached by less than about {3 / samples:.4%} of the range may be missing.")
+    summary_lines.append("--- End of Summary ---")
+
+    print("\n" + "\n".join(summary_lines))
+    if save_to_file:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        _save_summary(f"loop_sampling_{start_range}_to_{end_range}_{timestamp}.txt", summary_lines)
+
+def _report_loop_summary(start_range, end_range, loop_frequencies, save_to_file, tail_histograms=None):
+    """
+    Prints the loop frequency summary for [start_range, end_range] and
+    optionally saves it to a loop_analysis text file.
 
+    Args:
+        start_range: Starting number of the range
+        end_range: Ending number of the range
+        loop_frequencies: Dict mapping canonical loops to their counts
+        save_to_file: Whether to save results to a text file
+        tail_histograms: Optional dict of loop -> {tail_length: count} to
+                         print under each loop
+    """
     # Prepare summary text
     summary_lines = []
     summary_lines.append("--- Loop Analysis Summary ---")
@@ -138,12 +2490,15 @@ def analyze_number_range(start_range, end_range, show_individual_progress=False,
     sorted_loops = sorted(loop_frequencies.items(), key=lambda item: (item[1], item[0]), reverse=True)
 
     summary_lines.append(f"Analysis of numbers from {start_range} to {end_range}")
-    summary_lines.append(f"Total numbers processed: {total_numbers_to_process}")
+    summary_lines.append(f"Total numbers processed: {end_range - start_range + 1}")
     summary_lines.append(f"Found {len(sorted_loops)} distinct loop type(s):")
     summary_lines.append("")
     
     for loop, count in sorted_loops:
         summary_lines.append(f"  Loop: {list(loop)}  <-  {count} starting number(s) ended in this loop.")
+        if tail_histograms is not None:
+            histogram = ", ".join(f"{steps}: {n}" for steps, n in sorted(tail_histograms[loop].items()))
+            summary_lines.append(f"      Steps before entering the loop (steps: count): {histogram}")
     
     summary_lines.append("--- End of Summary ---")
 
@@ -153,84 +2508,593 @@ def analyze_number_range(start_range, end_range, show_individual_progress=False,
     # Save to file if requested
     if save_to_file:
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"loop_analysis_{start_range}_to_{end_range}_{timestamp}.txt"
-        
+        _save_summary(f"loop_analysis_{start_range}_to_{end_range}_{timestamp}.txt", summary_lines)
+
+def _count_loops_resumably(start_range, end_range, show_individual_progress, memo_size, tail_histograms,
+                           dedupe_reversals, attractors, workers, resume):
+    """
+    Runs the walking engine on [start_range, end_range] with a
+    RangeCheckpoint, loaded from its file when resuming, and saves it
+    before a Ctrl-C ends the run.
+    """
+    path = checkpoint_filename(start_range, end_range)
+    show_tail_lengths = tail_histograms is not None
+    if resume and os.path.exists(path):
+        checkpoint = RangeCheckpoint.load(path, start_range, end_range, show_tail_lengths)
+        print(f"Resuming from {path}: {checkpoint.processed_count} of "
+              f"{end_range - start_range + 1} numbers are already counted.")
+    else:
+        if resume:
+            print(f"No checkpoint found at {path}; starting from the beginning.")
+        checkpoint = RangeCheckpoint(path, start_range, end_range, show_tail_lengths)
+
+    try:
+        if workers is not None and workers > 1:
+            loop_frequencies = _count_loops_in_workers(
+                start_range, end_range, workers, memo_size, tail_histograms=tail_histograms,
+                dedupe_reversals=dedupe_reversals, attractors=attractors, checkpoint=checkpoint)
+        else:
+            loop_frequencies = _count_loops_with_checkpoints(
+                checkpoint, show_individual_progress, memo_size, tail_histograms=tail_histograms,
+                dedupe_reversals=dedupe_reversals, attractors=attractors)
+    except KeyboardInterrupt:
+        # Only whole chunks are recorded, so what is saved is exact
+        checkpoint.save()
+        print(f"\nInterrupted. Progress ({checkpoint.processed_count} numbers) is saved in {path}; "
+              "run the same range again with resume to continue.")
+        raise
+
+    # Kept until the summary is reported, in case that fails
+    checkpoint.save()
+    return loop_frequencies
+
+def analyze_number_range(start_range, end_range, show_individual_progress=False, save_to_file=True,
+                         memo_size=DEFAULT_MEMO_SIZE, engine="auto", show_tail_lengths=False,
+                         dedupe_reversals=True, attractors=None, precision=0.005, time_budget=None, seed=None,
+                         workers=None, checkpoint=False, resume=False):
+    """
+    Analyzes all numbers in a given range, tracks the loops they fall into,
+    and reports the frequency of each loop type. The 'sample' engine
+    estimates the frequencies from random starting numbers instead (see
+    estimate_loop_frequencies), for ranges too large to walk.
+
+    Args:
+        start_range: Starting number of the range
+        end_range: Ending number of the range
+        show_individual_progress: Whether to show verbose output for each number
+        save_to_file: Whether to save results to a text file
+        memo_size: Entries per generation of the trajectory memo shared by
+                   all walks in the range (None or 0 disables the memo)
+                   when walking; the compiled kernels used below
+                   JIT_LIMIT when Numba is installed do not use it
+        engine: 'python' walks each number, 'numpy' answers the range from a
+                successor table, 'auto' picks the table when NumPy is
+                available and the table fits in memory, 'sample' estimates
+                the frequencies from a stratified random sample
+        show_tail_lengths: Whether to add a histogram of the number of steps
+                           taken before entering the loop under each loop
+        dedupe_reversals: Whether the walking engine should walk only one
+                          number of each n / reverse_number(n) pair in the
+                          range and credit the result to both; like the
+                          memo, not used by the compiled kernels
+        attractors: Optional attractor set that ends walks at the first
+                    loop member reached (see build_attractor_set); not
+                    used by the compiled kernels either
+        precision: Target half-width of the 95% intervals of the 'sample'
+                   engine, as a share of the range
+        time_budget: Optional number of seconds after which the 'sample'
+                     engine stops
+        seed: Seed of the 'sample' engine's random numbers; when None, a
+              seed is drawn and reported so that the run can be repeated
+        workers: Number of processes the range is split across; None or 1
+                 keeps it in this process. The walking engine hands chunks
+                 to the processes as they ask for them (see
+                 _count_loops_in_workers), and the table engine shares its
+                 tables between them (see count_loops_with_shared_tables)
+                 unless tail lengths are shown or the tables do not fit in
+                 /dev/shm, in which case it builds them in this process.
+                 The summary is the same either way.
+        checkpoint: Whether to save the completed sub-ranges and partial
+                    counts to checkpoint_filename(start_range, end_range)
+                    as the walking engine goes, and on Ctrl-C. The file is
+                    removed once the summary is reported.
+        resume: Whether to continue from that file when it exists, walking
+                only the numbers it does not count yet; implies checkpoint
+    """
+    if engine not in ("auto", "python", "numpy", "sample"):
+        raise ValueError(f"Unknown engine: {engine!r}")
+    if engine in ("numpy", "sample") and show_individual_progress:
+        raise ValueError(f"The {engine!r} engine cannot show individual progress.")
+    if engine == "sample" and show_tail_lengths:
+        raise ValueError("The 'sample' engine cannot show tail lengths.")
+    if workers is not None and workers < 1:
+        raise ValueError("The number of workers must be a positive integer.")
+    if workers is not None and workers > 1 and show_individual_progress:
+        raise ValueError("Individual progress cannot be shown with several workers.")
+    checkpoint = checkpoint or resume
+    if checkpoint and engine in ("numpy", "sample"):
+        raise ValueError(f"The {engine!r} engine does not save checkpoints.")
+
+    if engine == "sample":
+        if seed is None:
+            seed = random.SystemRandom().randrange(2**32)
+        print(f"\nEstimating loop frequencies for numbers from {start_range} to {end_range} (seed {seed})...")
+        estimates, samples = estimate_loop_frequencies(
+            start_range, end_range, precision=precision, time_budget=time_budget, seed=seed,
+            attractors=attractors, show_progress=True)
+        _report_sampled_summary(start_range, end_range, estimates, samples, seed, 0.95, save_to_file)
+        return
+
+    print(f"\nAnalyzing numbers from {start_range} to {end_range}...")
+
+    use_table = engine == "numpy" or (
+        engine == "auto" and not show_individual_progress and not checkpoint
+        and _successor_table_pays_off(start_range, end_range, show_tail_lengths))
+    tail_histograms = {} if show_tail_lengths else None
+    if checkpoint:
+        loop_frequencies = _count_loops_resumably(
+            start_range, end_range, show_individual_progress, memo_size, tail_histograms,
+            dedupe_reversals, attractors, workers, resume)
+    elif (use_table and workers is not None and workers > 1 and tail_histograms is None
+          and _shared_tables_fit(*_shared_table_spec(end_range))):
+        loop_frequencies = count_loops_with_shared_tables(
+            start_range, end_range, workers, attractors=attractors, show_progress=True)
+    elif use_table:
+        loop_frequencies = count_loops_with_successor_table(
+            start_range, end_range, show_progress=True, tail_histograms=tail_histograms)
+    elif workers is not None and workers > 1:
+        loop_frequencies = _count_loops_in_workers(
+            start_range, end_range, workers, memo_size, tail_histograms=tail_histograms,
+            dedupe_reversals=dedupe_reversals, attractors=attractors)
+    else:
+        loop_frequencies = _count_loops_by_walking(
+            start_range, end_range, show_individual_progress, memo_size,
+            tail_histograms=tail_histograms, dedupe_reversals=dedupe_reversals, attractors=attractors)
+
+    _report_loop_summary(start_range, end_range, loop_frequencies, save_to_file, tail_histograms)
+    if checkpoint:
+        os.remove(checkpoint_filename(start_range, end_range))
+
+def analyze_digit_length(num_digits, save_to_file=True, memo_size=DEFAULT_MEMO_SIZE, attractors=None):
+    """
+    Reports the loop frequencies of every num_digits-digit number, using the
+    signature counting engine, in the same format as analyze_number_range.
+
+    Args:
+        num_digits: The digit length to analyze
+        save_to_file: Whether to save results to a text file
+        memo_size: Entries per generation of the trajectory memo
+        attractors: Optional attractor set that ends walks early
+                    (neither is used for numbers below JIT_LIMIT when
+                    Numba is installed)
+    """
+    start_range = 0 if num_digits == 1 else 10 ** (num_digits - 1)
+    end_range = 10 ** num_digits - 1
+    print(f"\nCounting loops for all {num_digits}-digit numbers ({start_range} to {end_range})...")
+    memo = TrajectoryMemo(memo_size) if memo_size else None
+    loop_frequencies = count_loops_for_digit_length(num_digits, memo=memo, show_progress=True, attractors=attractors)
+    _report_loop_summary(start_range, end_range, loop_frequencies, save_to_file)
+
+class _CoordinatorRequestHandler(socketserver.StreamRequestHandler):
+    """Passes each worker connection to the RangeCoordinator that owns the server."""
+
+    def handle(self):
+        self.server.coordinator._serve_connection(self)
+
+class RangeCoordinator:
+    """
+    Serves a range as leased work units to run_range_worker processes over
+    TCP, on this host or any other, and merges the loop counts they send
+    back.
+
+    The protocol is one JSON object per line. A worker sends
+    {"type": "lease"} and gets {"type": "unit", "unit": id, "start": a,
+    "end": b} with b exclusive, {"type": "wait", "seconds": s} while every
+    remaining unit is leased, or {"type": "done"}. It answers a unit with
+    {"type": "result", "unit": id, "counts": [[loop_minimum, count], ...]}
+    and gets {"type": "ack"}. The smallest member identifies a loop, so
+    the counts stay small however long the loops are.
+
+    A lease ends when its result arrives, when the worker's connection
+    closes, or after lease_seconds. Units whose lease ended without a
+    result are handed out again. Only the first result for a unit is
+    counted, so a slow worker answering late cannot count numbers twice.
+    """
+
+    def __init__(self, start_range, end_range, host="127.0.0.1", port=DEFAULT_COORDINATOR_PORT,
+                 unit_size=COORDINATOR_UNIT_SIZE, lease_seconds=LEASE_SECONDS):
+        if start_range < 0 or end_range < start_range:
+            raise ValueError("The range must be non-negative and not empty.")
+        if unit_size < 1:
+            raise ValueError("Unit size must be a positive integer.")
+        self.start_range = start_range
+        self.end_range = end_range
+        self.unit_size = unit_size
+        self.lease_seconds = lease_seconds
+        self.unit_count = -(-(end_range - start_range + 1) // unit_size)
+        self.minimum_counts = collections.defaultdict(int)
+        self.processed_count = 0
+        self.show_progress = True
+        self._next_unit = 0
+        self._returned_units = []  # Units whose lease ended without a result
+        self._leases = {}  # unit -> (connection, expiry time)
+        self._completed = set()
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._server = socketserver.ThreadingTCPServer((host, port), _CoordinatorRequestHandler)
+        self._server.daemon_threads = True
+        self._server.coordinator = self
+        self.address = self._server.server_address
+
+    def _unit_bounds(self, unit):
+        unit_start = self.start_range + unit * self.unit_size
+        return unit_start, min(unit_start + self.unit_size, self.end_range + 1)
+
+    def _lease(self, connection):
+        now = time.monotonic()
+        for unit, (_, expiry) in list(self._leases.items()):
+            if expiry <= now:
+                del self._leases[unit]
+                self._returned_units.append(unit)
+        while self._returned_units and self._returned_units[-1] in self._completed:
+            self._returned_units.pop()
+
+        if self._returned_units:
+            unit = self._returned_units.pop()
+        elif self._next_unit < self.unit_count:
+            unit = self._next_unit
+            self._next_unit += 1
+        elif self._leases:
+            return {"type": "wait", "seconds": 1}
+        else:
+            return {"type": "done"}
+        self._leases[unit] = (connection, now + self.lease_seconds)
+        unit_start, unit_end = self._unit_bounds(unit)
+        return {"type": "unit", "unit": unit, "start": unit_start, "end": unit_end}
+
+    def _accept_result(self, unit, counts):
+        self._leases.pop(unit, None)
+        if unit in self._completed or not 0 <= unit < self.unit_count:
+            return
+        self._completed.add(unit)
+        for minimum, count in counts:
+            self.minimum_counts[minimum] += count
+        unit_start, unit_end = self._unit_bounds(unit)
+        self.processed_count += unit_end - unit_start
+        if self.show_progress:
+            print(f"  Processed {self.processed_count}/{self.end_range - self.start_range + 1} numbers "
+                  f"({len(self._completed)}/{self.unit_count} units)...")
+        if len(self._completed) == self.unit_count:
+            self._finished.set()
+
+    def _release(self, connection):
+        for unit, (owner, _) in list(self._leases.items()):
+            if owner is connection:
+                del self._leases[unit]
+                self._returned_units.append(unit)
+
+    def _serve_connection(self, handler):
         try:
-            with open(filename, 'w') as f:
-                f.write(f"Number Loop Analysis Results\n")
-                f.write(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write("=" * 50 + "\n\n")
-                f.write("\n".join(summary_lines))
-                f.write(f"\n\n" + "=" * 50 + "\n")
-                f.write("Analysis completed successfully.\n")
-            
-            print(f"\nResults saved to: {filename}")
-            print(f"File location: {os.path.abspath(filename)}")
-            
-        except Exception as e:
-            print(f"\nError saving to file: {e}")
-            print("Results were displayed above but not saved.")
+            for line in handler.rfile:
+                message = json.loads(line)
+                with self._lock:
+                    if message.get("type") == "lease":
+                        reply = self._lease(handler)
+                    elif message.get("type") == "result":
+                        self._accept_result(message["unit"], message["counts"])
+                        reply = {"type": "ack"}
+                    else:
+                        reply = {"type": "error", "message": f"Unknown message type: {message.get('type')!r}"}
+                handler.wfile.write((json.dumps(reply) + "\n").encode())
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # A broken connection or message ends the connection
+        finally:
+            # Whatever the worker still held goes back to the queue
+            with self._lock:
+                self._release(handler)
+
+    def serve(self, show_progress=True):
+        """
+        Hands out units until every one has a result and returns a dict
+        mapping canonical loop tuples to their frequencies.
+        """
+        self.show_progress = show_progress
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        try:
+            self._finished.wait()
+        finally:
+            self._server.shutdown()
+            self._server.server_close()
+        return {find_ending_loop_for_number(minimum): count for minimum, count in self.minimum_counts.items()}
+
+def run_range_worker(host="127.0.0.1", port=DEFAULT_COORDINATOR_PORT, memo_size=DEFAULT_MEMO_SIZE,
+                     attractors=None):
+    """
+    Connects to a RangeCoordinator and walks the units it leases until it
+    has none left, sending back the loop counts of each unit.
+
+    Args:
+        host: Address of the coordinator
+        port: TCP port of the coordinator
+        memo_size: Entries per generation of the trajectory memo of each unit
+        attractors: Optional attractor set that ends walks early
+
+    Returns:
+        The number of units this worker completed.
+    """
+    units_completed = 0
+    with socket.create_connection((host, port)) as connection:
+        reader = connection.makefile("r", encoding="utf-8")
+        writer = connection.makefile("w", encoding="utf-8")
+
+        def request(message):
+            writer.write(json.dumps(message) + "\n")
+            writer.flush()
+            line = reader.readline()
+            # A closed connection means the coordinator has finished
+            return json.loads(line) if line else {"type": "done"}
+
+        try:
+            while True:
+                reply = request({"type": "lease"})
+                if reply["type"] == "done":
+                    break
+                if reply["type"] == "wait":
+                    time.sleep(reply["seconds"])
+                    continue
+                loop_frequencies = _count_loops_by_walking(
+                    reply["start"], reply["end"] - 1, False, memo_size, attractors=attractors, show_progress=False)
+                counts = [[loop[0], count] for loop, count in loop_frequencies.items()]
+                request({"type": "result", "unit": reply["unit"], "counts": counts})
+                units_completed += 1
+                print(f"  Finished unit {reply['unit']} ({reply['start']} to {reply['end'] - 1})...")
+        except ConnectionError:
+            print("Lost the connection to the coordinator.")
+    return units_completed
+
+def coordinate_range_analysis(start_range, end_range, host="", port=DEFAULT_COORDINATOR_PORT,
+                              unit_size=COORDINATOR_UNIT_SIZE, lease_seconds=LEASE_SECONDS, save_to_file=True):
+    """
+    Runs a RangeCoordinator for [start_range, end_range] until workers on
+    any host have walked the whole range, then reports the merged loop
+    frequencies like analyze_number_range.
+
+    Args:
+        start_range: Starting number of the range
+        end_range: Ending number of the range
+        host: Address to listen on; "" listens on every interface
+        port: TCP port to listen on
+        unit_size: Numbers per work unit
+        lease_seconds: Seconds before an unanswered unit is handed out again
+        save_to_file: Whether to save results to a text file
+    """
+    coordinator = RangeCoordinator(start_range, end_range, host=host, port=port, unit_size=unit_size,
+                                   lease_seconds=lease_seconds)
+    print(f"\nServing numbers from {start_range} to {end_range} as {coordinator.unit_count} unit(s) "
+          f"on port {coordinator.address[1]}...")
+    loop_frequencies = coordinator.serve()
+    _report_loop_summary(start_range, end_range, loop_frequencies, save_to_file)
+
+def _fit_loop_template(loop, k, other_loop, other_k):
+    """
+    Fits every run count of two same-shaped loops as coefficient * k +
+    offset. Returns the template, a tuple of members each a tuple of
+    (digit, coefficient, offset), or None when the shapes differ or a
+    count does not fit.
+    """
+    if len(loop) != len(other_loop):
+        return None
+    template = []
+    for member, other_member in zip(loop, other_loop):
+        if len(member) != len(other_member):
+            return None
+        runs = []
+        for (digit, count), (other_digit, other_count) in zip(member, other_member):
+            coefficient, remainder = divmod(other_count - count, other_k - k)
+            if digit != other_digit or remainder:
+                return None
+            runs.append((digit, coefficient, count - coefficient * k))
+        template.append(tuple(runs))
+    return tuple(template)
+
+def _template_matches(template, loop, k):
+    """Whether a loop found at k is the template evaluated at k."""
+    return len(template) == len(loop) and all(
+        len(runs) == len(member) and all(
+            digit == member_digit and coefficient * k + offset == count
+            for (digit, coefficient, offset), (member_digit, count) in zip(runs, member))
+        for runs, member in zip(template, loop))
+
+def _format_template(template):
+    """
+    Writes a loop template as [6 5 9{k-2} 3 4, ...]. Members that do not
+    depend on k are written as plain integers, e.g. [2178, 6534].
+    """
+    members = []
+    for runs in template:
+        if all(coefficient == 0 for _, coefficient, _ in runs):
+            members.append("".join(str(digit) * offset for digit, _, offset in runs))
+            continue
+        parts = []
+        for digit, coefficient, offset in runs:
+            if coefficient == 0:
+                parts.append(str(digit) if offset == 1 else f"{digit}{{{offset}}}")
+                continue
+            count = "k" if coefficient == 1 else f"{coefficient}k"
+            if offset:
+                count += f"{offset:+d}"
+            parts.append(f"{digit}{{{count}}}")
+        members.append(" ".join(parts))
+    return "[" + ", ".join(members) + "]"
+
+def _group_family_results(ks, results):
+    """
+    Splits sorted k values into runs of consecutive values whose loops
+    share one template. Groups are grown from the largest k down, so the
+    regime that holds for large k is found first and irregular small k
+    split off on their own.
+
+    Returns:
+        A list of (ks, template) pairs in increasing k.
+    """
+    groups = []
+    for k in reversed(ks):
+        loop = results[k][0]
+        if groups:
+            group_ks, template = groups[-1]
+            if template is None:
+                template = _fit_loop_template(loop, k, results[group_ks[0]][0], group_ks[0])
+                if template is not None:
+                    groups[-1] = (group_ks + [k], template)
+                    continue
+            elif _template_matches(template, loop, k):
+                group_ks.append(k)
+                continue
+        groups.append(([k], None))
+    return [(group_ks[::-1], template if template is not None else
+             tuple(tuple((digit, 0, count) for digit, count in member) for member in results[group_ks[0]][0]))
+            for group_ks, template in reversed(groups)]
+
+def analyze_number_family(family, k_values, label="family", save_to_file=True):
+    """
+    Finds the loop of every member of a parametric family, such as
+    repdigit_family(7) or shifted_sum_family(3, 7), for the given k values,
+    and summarizes the results at family level. Loops whose run counts
+    grow linearly with k are written once as a template in k, e.g.
+    "For all tested k >= 5: ends in loop [6 5 9{k-2} 3 4]", and families
+    that cycle through several loops as k grows are split by k mod period.
+    Periods are only found when the tested k values are dense enough.
+
+    Args:
+        family: Function mapping k to a run-length encoded number
+        k_values: The values of k to test
+        label: Name of the family used in the summary
+        save_to_file: Whether to save results to a text file
+
+    Returns:
+        A list of (k_min, k_max, period, residues, template, tail_lengths)
+        groups: every tested k in [k_min, k_max] with k % period in
+        residues ends in the loop given by template, after one of
+        tail_lengths steps.
+    """
+    k_values = sorted(set(k_values))
+    if not k_values:
+        raise ValueError("At least one value of k is needed.")
+    print(f"\nAnalyzing family {label} for {len(k_values)} value(s) of k...")
+
+    results = {}
+    for index, k in enumerate(k_values, start=1):
+        results[k] = find_ending_loop_runs(family(k))
+        if index % 100 == 0 or index == len(k_values):
+            print(f"  Processed {index}/{len(k_values)} values of k (up to {k})...")
+
+    # Members of a family often alternate between a few behaviours as k
+    # grows, so the k values are split by k mod period for every period up
+    # to FAMILY_MAX_PERIOD, and the period whose classes all become regular
+    # (one template each) from the smallest k on is kept.
+    threshold, period, class_groups = None, 1, {}
+    for candidate in range(1, FAMILY_MAX_PERIOD + 1):
+        classes = {}
+        for k in k_values:
+            classes.setdefault(k % candidate, []).append(k)
+        top_groups = {residue: _group_family_results(ks, results)[-1] for residue, ks in classes.items()}
+        candidate_threshold = max(ks[0] for ks, _ in top_groups.values())
+        if threshold is None or candidate_threshold < threshold:
+            threshold, period, class_groups = candidate_threshold, candidate, top_groups
+
+    summary_groups = []
+    for ks, template in _group_family_results([k for k in k_values if k < threshold], results):
+        summary_groups.append((ks[0], ks[-1], 1, (0,), template, sorted({results[k][1] for k in ks})))
+    regular = {}
+    for residue, (ks, template) in sorted(class_groups.items()):
+        residues, tail_lengths = regular.setdefault(template, ([], set()))
+        residues.append(residue)
+        tail_lengths.update(results[k][1] for k in ks if k >= threshold)
+    for template, (residues, tail_lengths) in regular.items():
+        summary_groups.append((threshold, k_values[-1], period, tuple(residues), template, sorted(tail_lengths)))
+
+    summary_lines = []
+    summary_lines.append("--- Family Analysis Summary ---")
+    summary_lines.append(f"Family: {label}")
+    summary_lines.append(f"Tested {len(k_values)} value(s) of k from {k_values[0]} to {k_values[-1]}")
+    summary_lines.append("")
+    for k_min, k_max, group_period, residues, template, tail_lengths in summary_groups:
+        if k_min == k_max:
+            scope = f"For k = {k_min}"
+        elif k_max == k_values[-1]:
+            scope = f"For all tested k >= {k_min}"
+        else:
+            scope = f"For all tested k with {k_min} <= k <= {k_max}"
+        if len(residues) < group_period:
+            if len(residues) == 1:
+                scope += f" with k mod {group_period} = {residues[0]}"
+            else:
+                scope += f" with k mod {group_period} in {residues}"
+        steps = str(tail_lengths[0]) if len(tail_lengths) == 1 else f"{tail_lengths[0]} to {tail_lengths[-1]}"
+        summary_lines.append(f"  {scope}: ends in loop {_format_template(template)}")
+        summary_lines.append(f"      Loop of {len(template)} number(s), entered after {steps} step(s)")
+    summary_lines.append("--- End of Summary ---")
+
+    print("\n" + "\n".join(summary_lines))
+
+    if save_to_file:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        _save_summary(f"family_analysis_{timestamp}.txt", summary_lines, header="Number Family Analysis Results")
+
+    return summary_groups
 
 def analyze_single_number_to_file(number, save_to_file=True):
     """
     Analyzes a single number and optionally saves the detailed results to a file.
+    The steps are written to the file as they are printed.
     
     Args:
         number: The number to analyze
         save_to_file: Whether to save results to a text file
     """
-    if save_to_file:
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"single_number_analysis_{number}_{timestamp}.txt"
-        
-        try:
-            # Capture the analysis output
-            import io
-            import sys
-            
-            # Redirect stdout to capture print statements
-            old_stdout = sys.stdout
-            sys.stdout = captured_output = io.StringIO()
-            
-            # Run the analysis
-            result = find_ending_loop_for_number(number, verbose=True)
-            
-            # Get the captured output
-            analysis_text = captured_output.getvalue()
-            
-            # Restore stdout
-            sys.stdout = old_stdout
-            
-            # Print to console as well
-            print(analysis_text)
-            
-            # Save to file
-            with open(filename, 'w') as f:
-                f.write(f"Single Number Loop Analysis\n")
-                f.write(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write("=" * 50 + "\n\n")
-                f.write(analysis_text)
-                f.write(f"\n" + "=" * 50 + "\n")
-                f.write(f"Final canonical loop: {list(result)}\n")
-                f.write("Analysis completed successfully.\n")
-            
-            print(f"\nDetailed analysis saved to: {filename}")
-            print(f"File location: {os.path.abspath(filename)}")
-            
-        except Exception as e:
-            print(f"\nError saving to file: {e}")
-            print("Analysis was displayed above but not saved.")
-            # Run analysis normally if file saving fails
-            find_ending_loop_for_number(number, verbose=True)
-    else:
+    if not save_to_file:
+        find_ending_loop_for_number(number, verbose=True)
+        return
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"single_number_analysis_{number}_{timestamp}.txt"
+    try:
+        output_file = open(filename, 'w')
+    except OSError as e:
+        print(f"\nError saving to file: {e}")
+        print("Showing the analysis without saving it.")
         find_ending_loop_for_number(number, verbose=True)
+        return
+
+    with output_file:
+        output_file.write(f"Single Number Loop Analysis\n")
+        output_file.write(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        output_file.write("=" * 50 + "\n\n")
+
+        def write_line(line):
+            print(line)
+            output_file.write(line + "\n")
+
+        result, _ = _report_trajectory(number, write_line)
+        output_file.write(f"\n" + "=" * 50 + "\n")
+        output_file.write(f"Final canonical loop: {list(result)}\n")
+        output_file.write("Analysis completed successfully.\n")
+
+    print(f"\nDetailed analysis saved to: {filename}")
+    print(f"File location: {os.path.abspath(filename)}")
 
 # --- Main part of the program ---
 if __name__ == "__main__":
+    # A prebuilt attractor set lets range walks stop at the first loop member
+    attractors = None
+    if os.path.exists(DEFAULT_ATTRACTOR_FILE):
+        attractors = load_attractor_set(DEFAULT_ATTRACTOR_FILE)
+    calibrate_reverse_number()
+
     while True:
         try:
             print("\n------------------------------------------------------------")
-            mode = input("Choose mode: (1) Analyze a single number with details, (2) Analyze a range of numbers, (exit) to quit: ").strip().lower()
+            mode = input("Choose mode: (1) Analyze a single number with details, (2) Analyze a range of numbers, (3) Count loops for all numbers of a digit length, (4) Serve a range to workers on other hosts, (5) Work for a coordinator, (exit) to quit: ").strip().lower()
             print("------------------------------------------------------------")
 
             if mode == 'exit':
@@ -262,19 +3126,72 @@ if __name__ == "__main__":
                 if end_val < start_val:
                     print("End of range cannot be less than the start of the range.")
                     continue
-                
-                # Ask if user wants verbose output for each number in range (usually no for large ranges)
-                verbose_range_str = input("Show step-by-step for each number in range? (yes/no, default: no): ").strip().lower()
-                show_steps_in_range = verbose_range_str == 'yes'
+
+                engine = "auto"
+                show_steps_in_range = False
+                if end_val - start_val + 1 > SAMPLE_RANGE_SIZE:
+                    sample_str = input("Estimate from a random sample instead of walking every number? (yes/no, default: yes): ").strip().lower()
+                    if sample_str != 'no':
+                        engine = "sample"
+                if engine != "sample":
+                    # Ask if user wants verbose output for each number in range (usually no for large ranges)
+                    verbose_range_str = input("Show step-by-step for each number in range? (yes/no, default: no): ").strip().lower()
+                    show_steps_in_range = verbose_range_str == 'yes'
+
+                use_checkpoint = resume_run = False
+                if engine != "sample" and os.path.exists(checkpoint_filename(start_val, end_val)):
+                    resume_str = input("A checkpoint of this range exists. Resume from it? (yes/no, default: yes): ").strip().lower()
+                    resume_run = resume_str != 'no'
+                    use_checkpoint = True
+                elif (engine != "sample" and end_val - start_val + 1 > CHECKPOINT_RANGE_SIZE
+                      and (show_steps_in_range or not _successor_table_pays_off(start_val, end_val))):
+                    checkpoint_str = input("Save checkpoints so the run can be resumed after a crash or Ctrl-C? (yes/no, default: yes): ").strip().lower()
+                    use_checkpoint = checkpoint_str != 'no'
                 
                 # Ask if user wants to save to file
                 save_str = input("Save summary results to file? (yes/no, default: yes): ").strip().lower()
                 save_file = save_str != 'no'
 
-                analyze_number_range(start_val, end_val, show_individual_progress=show_steps_in_range, save_to_file=save_file)
+                analyze_number_range(start_val, end_val, show_individual_progress=show_steps_in_range, save_to_file=save_file,
+                                     engine=engine, attractors=attractors, checkpoint=use_checkpoint, resume=resume_run)
             
+            elif mode == '3':
+                digits_str = input("Enter the digit length (positive integer): ")
+                num_digits = int(digits_str)
+                if num_digits < 1:
+                    print("Digit length must be a positive integer.")
+                    continue
+
+                # Ask if user wants to save to file
+                save_str = input("Save summary results to file? (yes/no, default: yes): ").strip().lower()
+                save_file = save_str != 'no'
+
+                analyze_digit_length(num_digits, save_to_file=save_file, attractors=attractors)
+
+            elif mode == '4':
+                start_val = int(input("Enter the start of the range (non-negative integer): "))
+                end_val = int(input("Enter the end of the range (non-negative integer): "))
+                if start_val < 0 or end_val < start_val:
+                    print("Please enter a non-negative range whose end is not below its start.")
+                    continue
+                port_str = input(f"Port to listen on (default: {DEFAULT_COORDINATOR_PORT}): ").strip()
+                port = int(port_str) if port_str else DEFAULT_COORDINATOR_PORT
+
+                # Ask if user wants to save to file
+                save_str = input("Save summary results to file? (yes/no, default: yes): ").strip().lower()
+                save_file = save_str != 'no'
+
+                coordinate_range_analysis(start_val, end_val, port=port, save_to_file=save_file)
+
+            elif mode == '5':
+                host = input("Coordinator address (default: 127.0.0.1): ").strip() or "127.0.0.1"
+                port_str = input(f"Coordinator port (default: {DEFAULT_COORDINATOR_PORT}): ").strip()
+                port = int(port_str) if port_str else DEFAULT_COORDINATOR_PORT
+                units = run_range_worker(host, port, attractors=attractors)
+                print(f"Completed {units} unit(s).")
+
             else:
-                print("Invalid mode selected. Please choose '1', '2', or 'exit'.")
+                print("Invalid mode selected. Please choose '1', '2', '3', '4', '5', or 'exit'.")
 
         except ValueError:
             print("Invalid input. Please enter valid integers where required.")